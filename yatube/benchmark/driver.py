@@ -0,0 +1,207 @@
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.contrib.sessions.backends.db import SessionStore
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.urls import reverse
+
+from core.timing import percentile
+from posts.models import Group, Post, User
+
+# Доля каждого представления в смеси запросов по умолчанию
+DEFAULT_MIX = {
+    'posts:index': 40,
+    'posts:group_list': 20,
+    'posts:profile': 20,
+    'posts:post_detail': 15,
+    'posts:post_create': 5,
+}
+PAGED_VIEWS = {'posts:index', 'posts:group_list', 'posts:profile'}
+SAMPLE_SIZE = 500
+SQL_COUNT = re.compile(r'desc="(\d+) SQL"')
+
+
+def latency_summary(values):
+    return {
+        'mean': sum(values) / len(values) if values else 0,
+        'p50': percentile(values, .5),
+        'p95': percentile(values, .95),
+        'p99': percentile(values, .99),
+    }
+
+
+class Driver:
+    """Гоняет взвешенную смесь запросов через WSGI-приложение в потоках."""
+
+    def __init__(self, application, mix=None, workers=16, seed=0,
+                 logged_in=False):
+        self.application = application
+        self.mix = mix or DEFAULT_MIX
+        self.workers = workers
+        # Чтение от имени вошедшего пользователя, а не гостя
+        self.logged_in = logged_in
+        self.rng = random.Random(seed)
+        self.post_ids = list(Post.objects.order_by('?').values_list(
+            'pk', flat=True)[:SAMPLE_SIZE])
+        self.slugs = list(Group.objects.order_by('?').values_list(
+            'slug', flat=True)[:SAMPLE_SIZE])
+        self.usernames = list(User.objects.filter(
+            posts__isnull=False).distinct().order_by('?').values_list(
+                'username', flat=True)[:SAMPLE_SIZE])
+        self.writer_cookies, self.csrf_token = self.login(
+            User.objects.get(username=self.usernames[0]))
+
+    @staticmethod
+    def login(user):
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = (
+            'django.contrib.auth.backends.ModelBackend')
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        request = HttpRequest()
+        token = get_token(request)
+        cookies = (f'sessionid={session.session_key}; '
+                   f'csrftoken={request.META["CSRF_COOKIE"]}')
+        return cookies, token
+
+    def plan(self, total):
+        """Список (имя URL, метод, путь, тело) для всего прогона."""
+        names = self.rng.choices(
+            list(self.mix), weights=list(self.mix.values()), k=total)
+        return [self.build(name) for name in names]
+
+    def build(self, name):
+        if name == 'posts:post_create':
+            body = urlencode({'text': 'Пост из нагрузочного теста'})
+            return name, 'POST', reverse(name), body.encode()
+        if name == 'posts:group_list':
+            kwargs = {'slug': self.rng.choice(self.slugs)}
+        elif name == 'posts:profile':
+            kwargs = {'username': self.rng.choice(self.usernames)}
+        elif name == 'posts:post_detail':
+            kwargs = {'post_id': self.rng.choice(self.post_ids)}
+        else:
+            kwargs = {}
+        path = reverse(name, kwargs=kwargs)
+        # Большинство читателей смотрят первые страницы ленты
+        if name in PAGED_VIEWS and self.rng.random() < .2:
+            path += f'?page={self.rng.randint(2, 5)}'
+        return name, 'GET', path, b''
+
+    def environ(self, method, path, body):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if method == 'POST' or self.logged_in:
+            environ['HTTP_COOKIE'] = self.writer_cookies
+        if method == 'POST':
+            environ.update({
+                'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+                'CONTENT_LENGTH': str(len(body)),
+                'HTTP_X_CSRFTOKEN': self.csrf_token,
+            })
+        return environ
+
+    def call(self, request):
+        name, method, path, body = request
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split()[0])
+            response['headers'] = dict(headers)
+
+        started = time.perf_counter()
+        chunks = self.application(self.environ(method, path, body),
+                                  start_response)
+        try:
+            for _ in chunks:
+                pass
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        elapsed = time.perf_counter() - started
+        match = SQL_COUNT.search(response['headers'].get('Server-Timing', ''))
+        return (name, response['status'], elapsed,
+                int(match.group(1)) if match else None)
+
+    def run(self, total):
+        requests = self.plan(total)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            samples = list(executor.map(self.call, requests))
+        duration = time.perf_counter() - started
+        return self.report(samples, duration)
+
+    def report(self, samples, duration):
+        by_view = defaultdict(list)
+        for sample in samples:
+            by_view[sample[0]].append(sample)
+        views = {}
+        for name, rows in sorted(by_view.items()):
+            queries = [row[3] for row in rows if row[3] is not None]
+            views[name] = {
+                'requests': len(rows),
+                'errors': sum(row[1] >= 400 for row in rows),
+                'latency_ms': latency_summary(
+                    [row[2] * 1000 for row in rows]),
+                'queries_per_request': (
+                    sum(queries) / len(queries) if queries else None),
+            }
+        return {
+            'requests': len(samples),
+            'errors': sum(sample[1] >= 400 for sample in samples),
+            'workers': self.workers,
+            'logged_in': self.logged_in,
+            'duration_s': duration,
+            'throughput_rps': len(samples) / duration if duration else 0,
+            'latency_ms': latency_summary(
+                [sample[2] * 1000 for sample in samples]),
+            'views': views,
+        }
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий относительно сохранённого прогона."""
+    regressions = []
+    if results['throughput_rps'] < baseline['throughput_rps'] * (
+            1 - tolerance):
+        regressions.append(
+            f'throughput: {baseline["throughput_rps"]:.1f} → '
+            f'{results["throughput_rps"]:.1f} rps')
+    for name, view in results['views'].items():
+        before = baseline['views'].get(name)
+        if before is None:
+            continue
+        p95, old_p95 = view['latency_ms']['p95'], before['latency_ms']['p95']
+        if p95 > old_p95 * (1 + tolerance):
+            regressions.append(
+                f'{name} p95: {old_p95:.1f} → {p95:.1f} мс')
+        queries = view['queries_per_request']
+        old_queries = before['queries_per_request']
+        if None not in (queries, old_queries) and queries > old_queries:
+            regressions.append(
+                f'{name} SQL: {old_queries:.1f} → {queries:.1f} на запрос')
+    return regressions
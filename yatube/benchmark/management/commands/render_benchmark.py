@@ -0,0 +1,87 @@
+import json
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.template import Engine, RequestContext, engines
+from django.test import RequestFactory
+from django.utils import timezone
+
+from posts.models import Group, Post, User
+
+# Шаблоны лент и какой контекст кроме page_obj им нужен
+FEED_TEMPLATES = {
+    'posts/includes/index_feed.html': (),
+    'posts/group_list.html': ('group',),
+    'posts/profile.html': ('author', 'posts_count'),
+}
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+
+def build_engine(cached):
+    """Копия движка проекта с кэшем скомпилированных шаблонов или без
+    него (как при DEBUG = True)."""
+    base = engines['django'].engine
+    loaders = base.loaders
+    if loaders[0][0] == CACHED_LOADER:
+        loaders = loaders[0][1]
+    if cached:
+        loaders = [(CACHED_LOADER, loaders)]
+    return Engine(dirs=base.dirs, loaders=loaders,
+                  context_processors=base.context_processors,
+                  libraries=base.libraries, debug=base.debug)
+
+
+def build_context(page_size):
+    """Страница из page_size несохранённых постов: в базу не ходим,
+    замеряется только шаблон."""
+    author = User(pk=1, username='leo', first_name='Лев',
+                  last_name='Толстой')
+    group = Group(pk=1, title='Классика', slug='classic',
+                  description='Русская классика')
+    now = timezone.now()
+    posts = [
+        Post(pk=number, author=author, group=group, pub_date=now,
+             text='Строка текста поста\n' * 5)
+        for number in range(page_size, 0, -1)
+    ]
+    return {
+        'page_obj': Paginator(posts, page_size).get_page(1),
+        'group': group,
+        'author': author,
+        'posts_count': page_size,
+    }
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время рендера страницы ленты по шаблонам ленты '
+            'с кэшем скомпилированных шаблонов и без него.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500)
+        parser.add_argument('--page-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['page_size'] < 1:
+            raise CommandError('Параметры должны быть положительными.')
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        context = build_context(options['page_size'])
+        results = {}
+        for cached in (False, True):
+            engine = build_engine(cached)
+            loader = 'cached' if cached else 'uncached'
+            for name, extra in FEED_TEMPLATES.items():
+                values = {key: context[key] for key in ('page_obj',) + extra}
+                started = time.perf_counter()
+                for _ in range(options['iterations']):
+                    engine.get_template(name).render(
+                        RequestContext(request, values))
+                elapsed = time.perf_counter() - started
+                results.setdefault(name, {})[loader] = (
+                    elapsed * 1000 / options['iterations'])
+        self.stdout.write(json.dumps(
+            {'ms_per_page': results, 'page_size': options['page_size'],
+             'iterations': options['iterations']},
+            indent=2, sort_keys=True))
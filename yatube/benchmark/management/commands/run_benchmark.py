@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmark.driver import DEFAULT_MIX, Driver, compare
+
+
+def parse_mix(value):
+    """«posts:index=40,posts:profile=20» → словарь весов."""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        mix[name.strip()] = int(weight)
+    return mix
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет смесь запросов к yatube.wsgi.application в несколько '
+            'потоков и печатает пропускную способность, перцентили задержки '
+            'и число SQL на запрос в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--mix', type=parse_mix,
+            help='Веса представлений, по умолчанию ' + ','.join(
+                f'{name}={weight}' for name, weight in DEFAULT_MIX.items()))
+        parser.add_argument(
+            '--logged-in', action='store_true',
+            help='Читать страницы от имени вошедшего пользователя')
+        parser.add_argument('--save', help='Сохранить результат в файл')
+        parser.add_argument(
+            '--baseline', help='Сравнить с сохранённым результатом')
+        parser.add_argument(
+            '--tolerance', type=float, default=.1,
+            help='Допустимое ухудшение относительно baseline (доля)')
+
+    def handle(self, *args, **options):
+        from yatube.wsgi import application
+        driver = Driver(application, options['mix'], options['workers'],
+                        options['seed'], options['logged_in'])
+        results = driver.run(options['requests'])
+        report = json.dumps(results, indent=2, sort_keys=True)
+        self.stdout.write(report)
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            regressions = compare(results, baseline, options['tolerance'])
+            if regressions:
+                lines = '\n'.join(regressions)
+                raise CommandError(f'Регрессии к baseline:\n{lines}')
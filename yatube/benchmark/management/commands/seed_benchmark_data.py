@@ -0,0 +1,80 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts.feed_cache import bump_feed_version
+from posts.management.commands.import_posts import preserve_pub_date
+from posts.models import Group, Post, User
+
+USERNAME = 'bench_user_{}'
+GROUP_SLUG = 'bench-group-{}'
+
+
+class Command(BaseCommand):
+    help = ('Создаёт N пользователей, M групп и P постов для нагрузочного '
+            'теста. Число постов у авторов и групп распределено по Парето: '
+            'немногие пишут много, большинство — мало.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней разбросать pub_date')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        password = make_password(None)
+        with transaction.atomic():
+            User.objects.bulk_create(
+                (User(username=USERNAME.format(number), password=password,
+                      first_name='Автор', last_name=str(number))
+                 for number in range(options['users'])))
+            Group.objects.bulk_create(
+                Group(title=f'Группа {number}',
+                      slug=GROUP_SLUG.format(number),
+                      description='Группа для нагрузочного теста')
+                for number in range(options['groups']))
+        author_ids = list(User.objects.filter(
+            username__startswith='bench_user_').values_list('pk', flat=True))
+        group_ids = list(Group.objects.filter(
+            slug__startswith='bench-group-').values_list('pk', flat=True))
+        author_weights = list(accumulate(
+            rng.paretovariate(1.2) for _ in author_ids))
+        group_weights = list(accumulate(
+            rng.paretovariate(1.2) for _ in group_ids))
+        now = timezone.now()
+        span = options['days'] * 24 * 3600
+
+        def posts():
+            for number in range(options['posts']):
+                group_id = None
+                # Примерно треть постов публикуется без группы
+                if group_ids and rng.random() > .3:
+                    group_id = rng.choices(
+                        group_ids, cum_weights=group_weights)[0]
+                pub_date = now - timedelta(seconds=rng.randint(0, span))
+                yield Post(
+                    author_id=rng.choices(
+                        author_ids, cum_weights=author_weights)[0],
+                    group_id=group_id,
+                    text=f'Пост {number}. ' + 'Текст для нагрузки. ' * (
+                        rng.randint(1, 40)),
+                    pub_date=pub_date,
+                    updated_at=pub_date,
+                )
+
+        with preserve_pub_date(), transaction.atomic():
+            Post.objects.bulk_create(posts())
+        call_command('recount_posts', stdout=self.stdout)
+        bump_feed_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {len(author_ids)} пользователей, '
+            f'{len(group_ids)} групп, {options["posts"]} постов'))
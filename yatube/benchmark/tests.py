@@ -0,0 +1,65 @@
+import atexit
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from posts.models import AuthorStats, Group, Post, User
+from yatube.wsgi import application, flush_views
+
+from .driver import DEFAULT_MIX, Driver, compare
+
+# Просмотры из тестов не должны уйти при выходе в рабочую базу, которая
+# к тому времени снова стоит на месте тестовой
+atexit.unregister(flush_views)
+
+
+class SeedAndDriveTests(TransactionTestCase):
+    def test_seed_then_replay_mix(self):
+        call_command('seed_benchmark_data', '--users', '20', '--groups', '3',
+                     '--posts', '200', stdout=StringIO())
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            200)
+        # Общая in-memory база тестов не ждёт блокировок, как файловая,
+        # поэтому параллельно гоняем только чтение, а запись — в один поток
+        reads = {name: weight for name, weight in DEFAULT_MIX.items()
+                 if name != 'posts:post_create'}
+        results = Driver(application, reads, workers=4).run(40)
+        self.assertEqual(results['requests'], 40)
+        self.assertEqual(results['errors'], 0, results['views'])
+        self.assertLessEqual(set(results['views']), set(reads))
+        for view in results['views'].values():
+            self.assertIsNotNone(view['queries_per_request'])
+        writes = Driver(application, {'posts:post_create': 1}, workers=1)
+        self.assertEqual(writes.run(3)['errors'], 0)
+        self.assertEqual(Post.objects.count(), 203)
+
+
+class RenderBenchmarkTests(SimpleTestCase):
+    def test_reports_every_feed_template(self):
+        out = StringIO()
+        call_command('render_benchmark', '--iterations', '2', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(len(report['ms_per_page']), 3)
+        for timings in report['ms_per_page'].values():
+            self.assertEqual(set(timings), {'cached', 'uncached'})
+
+
+class CompareTests(SimpleTestCase):
+    def results(self, rps, p95, queries):
+        return {
+            'throughput_rps': rps,
+            'views': {'posts:index': {'latency_ms': {'p95': p95},
+                                      'queries_per_request': queries}},
+        }
+
+    def test_compare_flags_regressions(self):
+        baseline = self.results(100, 10, 2)
+        self.assertEqual(compare(self.results(95, 10.5, 2), baseline, .1), [])
+        self.assertEqual(
+            len(compare(self.results(80, 20, 3), baseline, .1)), 3)
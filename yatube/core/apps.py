@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        if 'core.middleware.TimingMiddleware' in settings.MIDDLEWARE:
+            from .timing import install_template_timer
+            install_template_timer()
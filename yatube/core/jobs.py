@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (DEFAULT_DB_ALIAS, DatabaseError, close_old_connections,
+                       models)
+from django.utils import timezone
+
+from .models import Job
+from .timing import percentile
+
+logger = logging.getLogger(__name__)
+
+# Имя задачи -> (функция, попыток до отказа)
+registry = {}
+
+
+def job(name, max_attempts=None):
+    """Регистрирует функцию как задачу очереди под именем name.
+
+    Аргументы задачи хранятся в JSON, поэтому передавать нужно id и
+    простые значения, а не объекты моделей.
+    """
+    def decorator(func):
+        registry[name] = (func, max_attempts or settings.JOB_MAX_ATTEMPTS)
+        return func
+    return decorator
+
+
+def enqueue(name, *args, delay=0, **kwargs):
+    """Ставит задачу в очередь одним INSERT.
+
+    Внутри транзакции записи строка станет видна воркеру вместе с
+    записью, после фиксации; если запись откатится, задача пропадёт
+    вместе с ней.
+    """
+    if name not in registry:
+        raise LookupError(f'Задача {name} не зарегистрирована')
+    return Job.objects.using(DEFAULT_DB_ALIAS).create(
+        name=name,
+        arguments=json.dumps({'args': args, 'kwargs': kwargs}),
+        max_attempts=registry[name][1],
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def backoff(attempt):
+    """Пауза перед повтором: экспонента с разбросом, чтобы упавшие
+    разом задачи не повторялись тоже разом."""
+    delay = min(settings.JOB_BACKOFF_MAX_SECONDS,
+                settings.JOB_BACKOFF_SECONDS * 2 ** (attempt - 1))
+    return delay * random.uniform(1, 1.5)
+
+
+class Worker:
+    """Забирает задачи из таблицы Job и выполняет их в пуле потоков.
+
+    Задача захватывается условным UPDATE по статусу: из нескольких
+    воркеров и процессов строку получит только тот, чей UPDATE её
+    изменил. Пока задача выполняется, отдельный поток раз в
+    JOB_HEARTBEAT_SECONDS отмечает её, и живые задачи не забирают.
+    Итог попытки записывается, только если строка всё ещё за этим
+    воркером и этой попыткой. С одним потоком задачи выполняются в
+    вызывающем.
+    """
+
+    def __init__(self, threads=1, poll=None, name=None):
+        self.threads = threads
+        self.poll = settings.JOB_POLL_SECONDS if poll is None else poll
+        self.name = name or (
+            f'{socket.gethostname()}:{os.getpid()}:{id(self):x}')
+        self.stopping = threading.Event()
+        self.recovered = 0.0
+        self.finished = threading.Event()
+
+    def claim(self, limit):
+        now = timezone.now()
+        jobs = Job.objects.using(DEFAULT_DB_ALIAS)
+        claimed = [
+            pk for pk in jobs.filter(
+                status=Job.QUEUED, run_at__lte=now,
+            ).order_by('run_at').values_list('pk', flat=True)[:limit]
+            if jobs.filter(pk=pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, worker=self.name, started_at=now,
+                heartbeat_at=now, attempts=models.F('attempts') + 1)
+        ]
+        return list(jobs.filter(pk__in=claimed).order_by('run_at'))
+
+    def finish(self, job, **changes):
+        # Задачу могли счесть брошенной и отдать другому воркеру:
+        # тогда итог этой попытки не должен затереть его состояние
+        if not Job.objects.using(DEFAULT_DB_ALIAS).filter(
+                pk=job.pk, worker=self.name, attempts=job.attempts,
+        ).update(worker='', **changes):
+            logger.warning('Задачу %s, попытка %s, уже забрал другой '
+                           'воркер', job, job.attempts)
+            return False
+        return True
+
+    def perform(self, job):
+        """Выполняет задачу; возвращает True, если она прошла."""
+        started = time.perf_counter()
+        try:
+            func = registry[job.name][0]
+            arguments = json.loads(job.arguments)
+            func(*arguments['args'], **arguments['kwargs'])
+        except Exception:
+            duration = time.perf_counter() - started
+            now = timezone.now()
+            changes = {'duration': duration,
+                       'last_error': traceback.format_exc()[
+                           -settings.JOB_ERROR_LENGTH:]}
+            if job.attempts < job.max_attempts:
+                changes.update(status=Job.QUEUED, run_at=now + timedelta(
+                    seconds=backoff(job.attempts)))
+            else:
+                changes.update(status=Job.FAILED, finished_at=now)
+            logger.exception('Задача %s упала, попытка %s из %s',
+                             job, job.attempts, job.max_attempts)
+            self.finish(job, **changes)
+            return False
+        return self.finish(
+            job, status=Job.DONE, finished_at=timezone.now(),
+            duration=time.perf_counter() - started, last_error='')
+
+    def perform_in_thread(self, job):
+        try:
+            return self.perform(job)
+        finally:
+            close_old_connections()
+
+    def heartbeat(self):
+        Job.objects.using(DEFAULT_DB_ALIAS).filter(
+            status=Job.RUNNING, worker=self.name,
+        ).update(heartbeat_at=timezone.now())
+
+    def beat(self):
+        """Цикл потока отметок: до конца run()."""
+        while not self.finished.wait(settings.JOB_HEARTBEAT_SECONDS):
+            try:
+                self.heartbeat()
+            except DatabaseError:
+                logger.exception('Не удалось отметить задачи воркера %s',
+                                 self.name)
+            finally:
+                close_old_connections()
+
+    def recover(self):
+        """Возвращает в очередь задачи умерших воркеров и чистит старые.
+
+        Задача без отметки воркера дольше JOB_TIMEOUT_SECONDS считается
+        брошенной; у тех, чьи попытки кончились, — отказ.
+        """
+        now = timezone.now()
+        jobs = Job.objects.using(DEFAULT_DB_ALIAS)
+        stale = jobs.filter(
+            status=Job.RUNNING, heartbeat_at__lt=now - timedelta(
+                seconds=settings.JOB_TIMEOUT_SECONDS))
+        error = 'Воркер перестал отмечать задачу'
+        stale.filter(attempts__lt=models.F('max_attempts')).update(
+            status=Job.QUEUED, run_at=now, worker='', last_error=error)
+        stale.update(status=Job.FAILED, finished_at=now, worker='',
+                     last_error=error)
+        jobs.filter(status=Job.DONE, finished_at__lt=now - timedelta(
+            seconds=settings.JOB_KEEP_SECONDS)).delete()
+
+    def run(self, burst=False):
+        """Цикл воркера; с burst — до опустошения очереди.
+
+        Возвращает число выполненных задач.
+        """
+        performed = 0
+        pool = ThreadPoolExecutor(self.threads) if self.threads > 1 else None
+        self.finished.clear()
+        beating = threading.Thread(target=self.beat, daemon=True)
+        beating.start()
+        try:
+            while not self.stopping.is_set():
+                if time.monotonic() - self.recovered >= (
+                        settings.JOB_TIMEOUT_SECONDS / 10):
+                    self.recover()
+                    self.recovered = time.monotonic()
+                jobs = self.claim(self.threads)
+                if not jobs:
+                    if burst:
+                        break
+                    self.stopping.wait(self.poll)
+                    continue
+                if pool is None:
+                    for job in jobs:
+                        self.perform(job)
+                else:
+                    list(pool.map(self.perform_in_thread, jobs))
+                performed += len(jobs)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            self.finished.set()
+            beating.join()
+        return performed
+
+    def stop(self, *args):
+        """Останавливает цикл после текущих задач; годится как
+        обработчик сигнала."""
+        self.stopping.set()
+
+
+def run_process(threads, poll, burst):
+    # Соединения родителя после fork не годятся: каждый откроет своё
+    close_old_connections()
+    worker = Worker(threads=threads, poll=poll)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    return worker.run(burst=burst)
+
+
+def job_stats(since):
+    """Метрики задач с момента since по именам.
+
+    Ожидание — от постановки до начала последней попытки, выполнение —
+    длительность последней попытки.
+    """
+    stats = {}
+    for name, status, attempts, created_at, started_at, duration in (
+            Job.objects.using(DEFAULT_DB_ALIAS).filter(
+                created_at__gte=since).values_list(
+                    'name', 'status', 'attempts', 'created_at',
+                    'started_at', 'duration').iterator()):
+        row = stats.setdefault(name, {
+            'statuses': dict.fromkeys(dict(Job.STATUSES), 0),
+            'retries': 0, 'wait': [], 'run': []})
+        row['statuses'][status] += 1
+        row['retries'] += max(0, attempts - 1)
+        if started_at is not None:
+            row['wait'].append((started_at - created_at).total_seconds())
+        if duration is not None:
+            row['run'].append(duration)
+    for row in stats.values():
+        for metric in ('wait', 'run'):
+            values = row[metric]
+            row[metric] = {
+                name: percentile(values, fraction)
+                for name, fraction in (('p50', .5), ('p95', .95),
+                                       ('p99', .99))
+            }
+    return stats
@@ -0,0 +1,34 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.jobs import job_stats
+
+
+class Command(BaseCommand):
+    help = ('Выводит по каждой задаче очереди число задач в каждом '
+            'состоянии, повторы и p50/p95 ожидания и выполнения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        stats = job_stats(
+            timezone.now() - timedelta(hours=options['hours']))
+        if options['json']:
+            self.stdout.write(json.dumps(stats, indent=2, sort_keys=True))
+            return
+        for name, row in sorted(stats.items()):
+            statuses = ', '.join(
+                f'{status} {count}'
+                for status, count in row['statuses'].items() if count)
+            self.stdout.write(
+                f'{name}: {statuses}, повторов {row["retries"]}, '
+                f'ожидание p50 {row["wait"]["p50"] * 1000:.1f} мс, '
+                f'p95 {row["wait"]["p95"] * 1000:.1f} мс, '
+                f'выполнение p50 {row["run"]["p50"] * 1000:.1f} мс, '
+                f'p95 {row["run"]["p95"] * 1000:.1f} мс'
+            )
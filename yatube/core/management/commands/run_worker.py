@@ -0,0 +1,61 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import Worker, run_process
+
+
+class Command(BaseCommand):
+    help = ('Выполняет задачи фоновой очереди из таблицы Job: '
+            '--processes процессов по --threads потоков. С --burst '
+            'выходит, когда очередь опустеет.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int,
+                            default=settings.JOB_WORKER_THREADS)
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--poll', type=float,
+                            default=settings.JOB_POLL_SECONDS)
+        parser.add_argument('--burst', action='store_true')
+
+    def handle(self, *args, **options):
+        threads, poll, burst = (
+            max(1, options['threads']), options['poll'], options['burst'])
+        if options['processes'] > 1:
+            self.run_processes(options['processes'], threads, poll, burst)
+            return
+        worker = Worker(threads=threads, poll=poll)
+        signal.signal(signal.SIGTERM, worker.stop)
+        try:
+            performed = worker.run(burst=burst)
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {performed}'))
+
+    def run_processes(self, count, threads, poll, burst):
+        # Открытые соединения не должны достаться дочерним процессам
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=run_process, args=(threads, poll, burst))
+            for _ in range(count)
+        ]
+        for process in processes:
+            process.start()
+
+        def stop(*args):
+            for process in processes:
+                process.terminate()
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # Ctrl+C получила вся группа процессов: ждём, пока они
+            # доделают текущие задачи
+            for process in processes:
+                process.join()
@@ -0,0 +1,28 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.timing import published_samples, summarize
+
+
+class Command(BaseCommand):
+    help = ('Выводит p50/p95/p99 времени запросов по именам URL из снимков, '
+            'которые TimingMiddleware публикует в кэш.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        summary = summarize(published_samples())
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2, sort_keys=True))
+            return
+        for view_name, stats in sorted(summary.items()):
+            total = stats['total']
+            self.stdout.write(
+                f'{view_name}: {stats["count"]} запросов, '
+                f'p50 {total["p50"] * 1000:.1f} мс, '
+                f'p95 {total["p95"] * 1000:.1f} мс, '
+                f'p99 {total["p99"] * 1000:.1f} мс, '
+                f'SQL p95 {stats["queries"]["p95"]}'
+            )
@@ -0,0 +1,64 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .routers import pinned_to_primary, wrote_to_primary
+from .timing import RequestTimings, aggregate, current_timings
+
+PIN_COOKIE = 'pin_primary'
+
+
+class PinPrimaryMiddleware:
+    """Закрепляет пользователя за основной базой на время после записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = pinned_to_primary.set(PIN_COOKIE in request.COOKIES)
+        wrote = wrote_to_primary.set(False)
+        try:
+            response = self.get_response(request)
+            if wrote_to_primary.get() and settings.DATABASE_REPLICAS:
+                response.set_cookie(
+                    PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True, samesite='Lax')
+            return response
+        finally:
+            wrote_to_primary.reset(wrote)
+            pinned_to_primary.reset(pinned)
+
+
+class TimingMiddleware:
+    """Замеряет запросы: число SQL, время SQL, шаблонов и всего запроса.
+
+    Итог уходит в заголовок Server-Timing и в скользящее окно
+    core.timing.aggregate по имени URL (например, posts:index).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        total = time.perf_counter() - started
+        match = request.resolver_match
+        aggregate.record(
+            match.view_name if match else '<unresolved>', total, timings)
+        response['Server-Timing'] = (
+            f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} SQL", '
+            f'tpl;dur={timings.template * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+        return response
@@ -0,0 +1,84 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Задача фоновой очереди: побочные действия записи вне запроса.
+
+    Строка пишется в той же транзакции, что и сама запись, и видна
+    воркеру только после её фиксации. Время ожидания и выполнения
+    остаются в строке как метрики задачи. Доставка — хотя бы один раз:
+    задача, чей воркер умер, выполнится снова, поэтому задачи должны
+    быть идемпотентны.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField(verbose_name='Задача', max_length=100)
+    arguments = models.TextField(verbose_name='Аргументы в JSON')
+    status = models.CharField(
+        verbose_name='Состояние',
+        max_length=7,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток до отказа'
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Выполнить не раньше',
+        default=timezone.now
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Поставлена',
+        auto_now_add=True
+    )
+    started_at = models.DateTimeField(
+        verbose_name='Начало последней попытки',
+        null=True,
+        blank=True
+    )
+    finished_at = models.DateTimeField(
+        verbose_name='Завершена',
+        null=True,
+        blank=True
+    )
+    heartbeat_at = models.DateTimeField(
+        verbose_name='Последняя отметка воркера',
+        null=True,
+        blank=True
+    )
+    duration = models.FloatField(
+        verbose_name='Длительность последней попытки, с',
+        null=True,
+        blank=True
+    )
+    worker = models.CharField(
+        verbose_name='Воркер',
+        max_length=100,
+        blank=True
+    )
+    last_error = models.TextField(verbose_name='Ошибка', blank=True)
+
+    class Meta:
+        indexes = (
+            # Воркер ищет готовые к запуску задачи по этому индексу
+            models.Index(fields=('status', 'run_at'),
+                         name='job_status_run_at_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,31 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Состояние текущего запроса: закреплён ли он за основной базой
+# и была ли в нём запись. Middleware сбрасывает его на каждый запрос.
+pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+wrote_to_primary = ContextVar('wrote_to_primary', default=False)
+
+
+class PrimaryReplicaRouter:
+    """Чтение с реплик из settings.DATABASE_REPLICAS, запись — в default.
+
+    Запрос, закреплённый за основной базой (пользователь недавно писал),
+    читает тоже из default, чтобы сразу увидеть свои изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or pinned_to_primary.get():
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        wrote_to_primary.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе
+        return True
@@ -0,0 +1,36 @@
+"""Снимки состояния процессов в общем кэше.
+
+Каждый процесс кладёт свой снимок под ключ со своим pid и дописывает
+pid в общий список. Снимок остановленного процесса истекает сам, а его
+pid выпадает из списка при следующей публикации любого процесса.
+Снимки лежат в кэше CACHES['snapshots']: основной кэш может быть в
+памяти процесса, а команды статистики читают снимки из другого.
+"""
+import os
+
+from django.core.cache import caches
+
+
+def snapshot_key(prefix, pid):
+    return f'{prefix}:{pid}'
+
+
+def publish_snapshot(prefix, snapshot, timeout):
+    cache = caches['snapshots']
+    pid = os.getpid()
+    cache.set(snapshot_key(prefix, pid), snapshot, timeout)
+    pids_key = f'{prefix}:pids'
+    pids = cache.get(pids_key, set())
+    alive = cache.get_many(snapshot_key(prefix, pid) for pid in pids)
+    pids = {pid for pid in pids
+            if snapshot_key(prefix, pid) in alive} | {pid}
+    cache.set(pids_key, pids, None)
+
+
+def published_snapshots(prefix):
+    """Снимки всех живых процессов: {pid: снимок} по возрастанию pid."""
+    cache = caches['snapshots']
+    pids = cache.get(f'{prefix}:pids', set())
+    snapshots = cache.get_many(snapshot_key(prefix, pid) for pid in pids)
+    return {pid: snapshots[snapshot_key(prefix, pid)] for pid in sorted(pids)
+            if snapshot_key(prefix, pid) in snapshots}
@@ -0,0 +1,136 @@
+import json
+import mimetypes
+import os
+from email.utils import formatdate
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Имена без хэша могут поменять содержимое при следующем деплое
+MUTABLE = 'public, max-age=60'
+# Варианты в порядке предпочтения: (Content-Encoding, суффикс файла)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+TEXT_TYPES = ('text/', 'application/javascript', 'application/json',
+              'image/svg+xml')
+CHUNK_SIZE = 64 * 1024
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме явно запрещённых q=0."""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def read_chunks(file):
+    with file:
+        yield from iter(lambda: file.read(CHUNK_SIZE), b'')
+
+
+class StaticFile:
+    __slots__ = ('variants', 'content_type', 'cache_control')
+
+    def __init__(self, path, immutable):
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith(TEXT_TYPES):
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        self.cache_control = IMMUTABLE if immutable else MUTABLE
+        self.variants = {}
+        for encoding, suffix in (('identity', ''),) + ENCODINGS:
+            if os.path.isfile(path + suffix):
+                stat = os.stat(path + suffix)
+                self.variants[encoding] = (
+                    path + suffix, stat.st_size,
+                    f'"{int(stat.st_mtime):x}-{stat.st_size:x}-{encoding}"',
+                    formatdate(stat.st_mtime, usegmt=True),
+                )
+
+    def choose(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self.variants:
+                return encoding
+        return 'identity'
+
+
+class StaticFilesApp:
+    """WSGI-слой, отдающий файлы из STATIC_ROOT мимо Django.
+
+    Список файлов собирается один раз при старте: после collectstatic
+    процесс перезапускается. Файлы с хэшем в имени из манифеста
+    ManifestStaticFilesStorage кэшируются браузером навсегда, остальные —
+    на минуту. Если рядом лежат .br или .gz, клиенту, который их
+    принимает, отдаётся сжатый вариант с Content-Encoding.
+    """
+
+    def __init__(self, application, root, prefix):
+        self.application = application
+        self.prefix = prefix
+        self.files = self.scan(root) if root else {}
+
+    @staticmethod
+    def scan(root):
+        hashed = set()
+        manifest = os.path.join(root, 'staticfiles.json')
+        if os.path.isfile(manifest):
+            with open(manifest, encoding='utf-8') as file:
+                hashed = set(json.load(file).get('paths', {}).values())
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, root).replace(os.sep, '/')
+                if name.endswith(suffixes) and os.path.isfile(
+                        path.rsplit('.', 1)[0]):
+                    continue
+                files[relative] = StaticFile(path, relative in hashed)
+        return files
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(self.prefix) or environ[
+                'REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            return self.application(environ, start_response)
+        static_file = self.files.get(path[len(self.prefix):])
+        if static_file is None:
+            return self.application(environ, start_response)
+        return self.serve(static_file, environ, start_response)
+
+    def serve(self, static_file, environ, start_response):
+        encoding = static_file.choose(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        path, size, etag, last_modified = static_file.variants[encoding]
+        headers = [
+            ('Cache-Control', static_file.cache_control),
+            ('ETag', etag),
+            ('Last-Modified', last_modified),
+        ]
+        if len(static_file.variants) > 1:
+            headers.append(('Vary', 'Accept-Encoding'))
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH', '')
+        if etag in (tag.strip() for tag in if_none_match.split(',')):
+            start_response('304 Not Modified', headers)
+            return []
+        headers += [
+            ('Content-Type', static_file.content_type),
+            ('Content-Length', str(size)),
+        ]
+        if encoding != 'identity':
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file = open(path, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            return file_wrapper(file, CHUNK_SIZE)
+        return read_chunks(file)
@@ -0,0 +1,53 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Расширения, которые имеет смысл сжимать: картинки уже сжаты
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.xml',
+                '.map', '.ico', '.ttf', '.eot')
+# Меньше этого размера заголовок Content-Encoding съедает весь выигрыш
+MIN_SIZE = 256
+# Сжатый вариант храним, только если он заметно меньше оригинала
+MAX_RATIO = .95
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хэшированные имена файлов и заранее сжатые .gz/.br рядом с ними.
+
+    Сжатие идёт в collectstatic после хэширования, в рантайме сжимать
+    нечего: core.static.StaticFilesApp отдаёт готовый вариант. .br
+    появляется, только если установлен пакет brotli.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if not name.lower().endswith(COMPRESSIBLE):
+                continue
+            with self.open(name) as file:
+                content = file.read()
+            if len(content) < MIN_SIZE:
+                continue
+            for suffix, compress in compressors():
+                compressed = compress(content)
+                if len(compressed) > len(content) * MAX_RATIO:
+                    continue
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+                yield name, name + suffix, True
@@ -0,0 +1,385 @@
+import asyncio
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import transaction
+from django.test import (Client, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post, User
+
+from .asgi import WsgiToAsgi
+from .jobs import Worker, enqueue, job
+from .middleware import PIN_COOKIE
+from .models import Job
+from .routers import PrimaryReplicaRouter, pinned_to_primary
+from .static import StaticFilesApp
+from .timing import aggregate
+
+calls = []
+
+
+@job('core.tests.record', max_attempts=2)
+def record(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise ValueError(value)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_pinned_request_reads_primary(self):
+        token = pinned_to_primary.set(True)
+        self.addCleanup(pinned_to_primary.reset, token)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_is_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+
+# Реплика — та же база default: проверяем только логику закрепления
+@override_settings(DATABASE_REPLICAS=['default'])
+class PinPrimaryMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_write_pins_user_to_primary(self):
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_read_does_not_pin(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_follow_feed_pull_does_not_pin(self):
+        cache.clear()
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+class TimingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        caches['snapshots'].clear()
+        aggregate.reset()
+        self.guest_client = Client()
+
+    def test_server_timing_header(self):
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'auth'}))
+        header = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'total;dur=', '"2 SQL"'):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+
+    def test_aggregate_by_url_name(self):
+        for _ in range(3):
+            self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get('/unexisting_page/')
+        samples = aggregate.snapshot()
+        self.assertEqual(len(samples['posts:index']), 3)
+        self.assertEqual(len(samples['<unresolved>']), 1)
+        total, db, template, queries = samples['posts:index'][0]
+        self.assertGreater(template, 0)
+        self.assertGreaterEqual(total, template)
+
+    def test_timing_stats_command(self):
+        self.guest_client.get(reverse('posts:index'))
+        aggregate.publish()
+        out = StringIO()
+        call_command('timing_stats', stdout=out)
+        self.assertIn('posts:index: 1 запросов', out.getvalue())
+        # Команду запускают отдельным процессом: снимок виден и там
+        command = subprocess.run(
+            [sys.executable, 'manage.py', 'timing_stats'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True)
+        self.assertIn('posts:index: 1 запросов', command.stdout)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(poll=0, name='test')
+
+    def test_enqueue_commits_with_write(self):
+        with self.assertRaises(LookupError):
+            enqueue('core.tests.unknown')
+        try:
+            with transaction.atomic():
+                enqueue('core.tests.record', 'откат')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(Job.objects.exists())
+        enqueue('core.tests.record', 'запись')
+        self.assertEqual(self.worker.run(burst=True), 1)
+        self.assertEqual(calls, ['запись'])
+        done = Job.objects.get()
+        self.assertEqual((done.status, done.attempts), (Job.DONE, 1))
+        self.assertIsNotNone(done.duration)
+        out = StringIO()
+        call_command('job_stats', stdout=out)
+        self.assertIn('core.tests.record: done 1, повторов 0', out.getvalue())
+
+    def test_retry_with_backoff_then_fail(self):
+        enqueue('core.tests.record', 'сбой', fail=True)
+        started = timezone.now()
+        self.worker.run(burst=True)
+        retry = Job.objects.get()
+        self.assertEqual((retry.status, retry.attempts), (Job.QUEUED, 1))
+        self.assertIn('ValueError: сбой', retry.last_error)
+        self.assertGreaterEqual(
+            retry.run_at, started + timedelta(seconds=5))
+        # Повтор ждёт своего времени
+        self.assertEqual(self.worker.run(burst=True), 0)
+        Job.objects.update(run_at=timezone.now())
+        self.worker.run(burst=True)
+        failed = Job.objects.get()
+        self.assertEqual((failed.status, failed.attempts), (Job.FAILED, 2))
+        self.assertEqual(calls, ['сбой', 'сбой'])
+
+    def test_job_is_claimed_once(self):
+        enqueue('core.tests.record', 'один раз')
+        self.assertEqual(len(self.worker.claim(5)), 1)
+        self.assertEqual(Worker(name='other').claim(5), [])
+        self.assertEqual(Job.objects.get().worker, 'test')
+
+    def test_recover_requeues_abandoned_job(self):
+        enqueue('core.tests.record', 'брошена')
+        self.worker.claim(1)
+        Job.objects.update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(Worker(name='other').run(burst=True), 1)
+        self.assertEqual(calls, ['брошена'])
+        self.assertEqual(Job.objects.get().attempts, 2)
+
+    def test_heartbeat_keeps_long_job(self):
+        enqueue('core.tests.record', 'долгая')
+        self.worker.claim(1)
+        Job.objects.update(started_at=timezone.now() - timedelta(hours=1),
+                           heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.worker.heartbeat()
+        self.assertEqual(Worker(name='other').run(burst=True), 0)
+        self.assertEqual(Job.objects.get().status, Job.RUNNING)
+
+    def test_reclaimed_job_keeps_state_of_new_run(self):
+        enqueue('core.tests.record', 'дважды')
+        stale = self.worker.claim(1)[0]
+        Job.objects.update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(Worker(name='other').run(burst=True), 1)
+        done = Job.objects.get()
+        # Первая попытка доделалась после второй и ничего не затёрла
+        stale.arguments = json.dumps(
+            {'args': ['дважды'], 'kwargs': {'fail': True}})
+        self.assertFalse(self.worker.perform(stale))
+        self.assertEqual(calls, ['дважды', 'дважды'])
+        self.assertEqual(
+            Job.objects.values_list('status', 'attempts', 'finished_at',
+                                    'last_error').get(),
+            (Job.DONE, 2, done.finished_at, ''))
+
+
+class SharedLayoutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_layout_keeps_per_user_nav(self):
+        """Общие фрагменты кэшируются, а пункты пользователя — свои."""
+        user = User.objects.create_user(username='reader')
+        logged_in = Client()
+        logged_in.force_login(user)
+        guest_page = self.client.get(reverse('posts:index'))
+        self.assertContains(guest_page, 'Войти')
+        self.assertContains(guest_page, 'Технологии')
+        page = logged_in.get(reverse('posts:index'))
+        self.assertContains(page, 'Выйти')
+        self.assertContains(page, 'reader')
+        self.assertNotContains(page, 'Войти')
+        self.assertContains(page, 'Технологии')
+        self.assertNotContains(self.client.get(reverse('posts:index')),
+                               'reader')
+
+
+class WsgiToAsgiTests(TransactionTestCase):
+    def setUp(self):
+        self.application = WsgiToAsgi(get_wsgi_application(), max_workers=1)
+        self.addCleanup(self.application.executor.shutdown)
+
+    def scope(self, path, method='GET', headers=()):
+        return {
+            'type': 'http', 'method': method, 'path': path,
+            'query_string': b'', 'headers': list(headers),
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+        }
+
+    async def request(self, scope, receive):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await self.application(scope, receive, send)
+        start, body = messages
+        return start['status'], dict(start['headers']), body['body']
+
+    def test_get_page(self):
+        Post.objects.create(author=User.objects.create_user(username='auth'),
+                            text='Пост через ASGI')
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        status, headers, body = asyncio.run(
+            self.request(self.scope(reverse('posts:index')), receive))
+        self.assertEqual(status, 200)
+        self.assertIn(b'server-timing', headers)
+        self.assertIn('Пост через ASGI', body.decode())
+
+    def test_non_ascii_path(self):
+        User.objects.create_user(username='иван')
+        path = reverse('posts:profile', args=['иван'])
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        # Так путь присылает uvicorn: path раскодирован, raw_path — нет
+        scope = self.scope(unquote(path))
+        scope['raw_path'] = path.encode('ascii')
+        status, _, body = asyncio.run(self.request(scope, receive))
+        self.assertEqual(status, 200)
+        self.assertIn('иван', body.decode())
+
+    def test_slow_client_does_not_hold_worker(self):
+        """Пока медленный клиент шлёт тело, единственный поток свободен."""
+        body_sent = asyncio.Event()
+
+        async def slow_receive():
+            await body_sent.wait()
+            return {'type': 'http.request', 'body': b'text=x'}
+
+        async def fast_receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def scenario():
+            slow = asyncio.ensure_future(self.request(
+                self.scope(reverse('posts:post_create'), 'POST', [
+                    (b'content-type', b'application/x-www-form-urlencoded'),
+                    (b'content-length', b'6'),
+                ]), slow_receive))
+            fast = await asyncio.wait_for(self.request(
+                self.scope(reverse('about:author')), fast_receive), 5)
+            body_sent.set()
+            return fast, await slow
+
+        fast, slow = asyncio.run(scenario())
+        self.assertEqual(fast[0], 200)
+        # Запрос дошёл до Django: без CSRF-токена POST отклонён
+        self.assertEqual(slow[0], 403)
+
+    def test_lifespan(self):
+        messages = iter([{'type': 'lifespan.startup'},
+                         {'type': 'lifespan.shutdown'}])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.application({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete',
+                                'lifespan.shutdown.complete'])
+
+
+class StaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        self.css = 'body { color: black; }\n' * 50
+        with open(os.path.join(source.name, 'site.css'), 'w') as file:
+            file.write(self.css)
+        with override_settings(
+                STATICFILES_DIRS=[source.name], STATIC_ROOT=root.name,
+                STATICFILES_STORAGE=(
+                    'core.storage.CompressedManifestStaticFilesStorage')):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(root.name, 'staticfiles.json')) as file:
+            self.hashed = json.load(file)['paths']['site.css']
+        self.app = StaticFilesApp(self.django_app, root.name, '/static/')
+
+    @staticmethod
+    def django_app(environ, start_response):
+        start_response('404 Not Found', [])
+        return [b'django']
+
+    def get(self, path, **headers):
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+            response['headers'] = dict(headers)
+
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, **headers}
+        body = b''.join(self.app(environ, start_response))
+        return response['status'], response['headers'], body
+
+    def test_collectstatic_writes_compressed_variants(self):
+        status, headers, body = self.get(
+            f'/static/{self.hashed}', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body).decode(), self.css)
+        self.assertIn('immutable', headers['Cache-Control'])
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+
+    def test_plain_and_unhashed_files(self):
+        status, headers, body = self.get('/static/site.css')
+        self.assertEqual(body.decode(), self.css)
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertNotIn('immutable', headers['Cache-Control'])
+        self.assertEqual(headers['Content-Type'], 'text/css; charset=utf-8')
+
+    def test_revalidation_and_fallthrough(self):
+        _, headers, _ = self.get(f'/static/{self.hashed}')
+        status, _, body = self.get(f'/static/{self.hashed}',
+                                   HTTP_IF_NONE_MATCH=headers['ETag'])
+        self.assertEqual((status, body), ('304 Not Modified', b''))
+        self.assertEqual(self.get('/static/missing.css')[2], b'django')
+        self.assertEqual(self.get('/')[2], b'django')
@@ -0,0 +1,142 @@
+import functools
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.backends.django import Template
+
+from .snapshots import publish_snapshot, published_snapshots
+
+SNAPSHOT_PREFIX = 'timing:snapshot'
+METRICS = ('total', 'db', 'template', 'queries')
+
+# Замеры текущего запроса; None — запрос не измеряется
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('queries', 'db', 'template', 'template_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper: считает SQL."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """p50/p95/p99 по каждой метрике для словаря {имя URL: замеры}."""
+    summary = {}
+    for view_name, rows in samples.items():
+        summary[view_name] = {'count': len(rows)}
+        for position, metric in enumerate(METRICS):
+            values = [row[position] for row in rows]
+            summary[view_name][metric] = {
+                name: percentile(values, fraction)
+                for name, fraction in (('p50', .5), ('p95', .95),
+                                       ('p99', .99))
+            }
+    return summary
+
+
+class TimingAggregate:
+    """Скользящее окно последних замеров по именам URL в этом процессе.
+
+    Раз в REQUEST_TIMING_PUBLISH_SECONDS окно копируется в кэш, откуда
+    его читает команда timing_stats. Между процессами снимки видны
+    только при общем бэкенде кэша (memcached, redis, база).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(self._window)
+        self.published = 0.0
+
+    @staticmethod
+    def _window():
+        return deque(maxlen=settings.REQUEST_TIMING_WINDOW)
+
+    def record(self, view_name, total, timings):
+        with self.lock:
+            self.samples[view_name].append(
+                (total, timings.db, timings.template, timings.queries))
+        now = time.monotonic()
+        if now - self.published >= settings.REQUEST_TIMING_PUBLISH_SECONDS:
+            self.published = now
+            self.publish()
+
+    def snapshot(self):
+        with self.lock:
+            return {name: list(rows) for name, rows in self.samples.items()}
+
+    def publish(self):
+        # Снимки остановленных процессов со временем истекают сами
+        publish_snapshot(SNAPSHOT_PREFIX, self.snapshot(),
+                         settings.REQUEST_TIMING_PUBLISH_SECONDS * 10)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+
+
+aggregate = TimingAggregate()
+
+
+def published_samples():
+    """Объединяет снимки всех процессов, опубликованные в кэш."""
+    merged = defaultdict(list)
+    for snapshot in published_snapshots(SNAPSHOT_PREFIX).values():
+        for name, rows in snapshot.items():
+            merged[name].extend(rows)
+    return merged
+
+
+def timed_render(render):
+    """Обёртка Template.render: копит время шаблонов текущего запроса."""
+    @functools.wraps(render)
+    def wrapper(self, context=None, request=None):
+        timings = current_timings.get()
+        if timings is None:
+            return render(self, context, request)
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            timings.template_depth -= 1
+            # Вложенные рендеры уже учтены во внешнем
+            if not timings.template_depth:
+                timings.template += time.perf_counter() - started
+    wrapper.timed = True
+    return wrapper
+
+
+def install_template_timer():
+    """Оборачивает рендер шаблонов один раз на процесс.
+
+    Сигнал template_rendered Django шлёт только в тестах и без
+    длительности, поэтому обёртка. Её ставит CoreConfig.ready(), когда
+    включена TimingMiddleware; вне измеряемых запросов она сразу
+    передаёт вызов дальше.
+    """
+    if not getattr(Template.render, 'timed', False):
+        Template.render = timed_render(Template.render)
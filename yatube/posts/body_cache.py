@@ -0,0 +1,124 @@
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import cache
+from django.template.defaultfilters import linebreaksbr
+from django.utils.safestring import mark_safe
+
+from core.snapshots import publish_snapshot, published_snapshots
+
+from .settings import (POST_BODY_CACHE_TIMEOUT, POST_BODY_LRU_SIZE,
+                       POST_BODY_STATS_PUBLISH_SECONDS)
+
+BODY_KEY = 'post:body:{pk}:{digest}'
+STATS_PREFIX = 'post:body:stats'
+COUNTERS = ('lru_hits', 'cache_hits', 'misses')
+
+
+def body_digest(text):
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def render_body(text):
+    return linebreaksbr(text, autoescape=True)
+
+
+class BodyCache:
+    """HTML текстов постов: LRU процесса перед общим кэшем.
+
+    Ключ включает хэш текста, поэтому после правки поста (post_edit,
+    админка) старый HTML не отдаётся ни из одного процесса. В LRU на
+    пост хранится одна запись: (хэш, HTML).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.chars = 0
+        self.counters = Counter()
+        self.published = 0.0
+
+    def get(self, post):
+        if post.pk is None:
+            return render_body(post.text)
+        digest = body_digest(post.text)
+        with self.lock:
+            entry = self.entries.get(post.pk)
+            if entry is not None and entry[0] == digest:
+                self.entries.move_to_end(post.pk)
+                self.counters['lru_hits'] += 1
+                html = entry[1]
+            else:
+                html = None
+        if html is None:
+            key = BODY_KEY.format(pk=post.pk, digest=digest)
+            html = cache.get(key)
+            if html is None:
+                html = render_body(post.text)
+                cache.set(key, html, POST_BODY_CACHE_TIMEOUT)
+                self.count('misses')
+            else:
+                self.count('cache_hits')
+            self.put(post.pk, digest, html)
+        self.maybe_publish()
+        return mark_safe(html)
+
+    def store(self, post):
+        """Кладёт свежий HTML поста в оба уровня кэша."""
+        digest = body_digest(post.text)
+        html = render_body(post.text)
+        cache.set(BODY_KEY.format(pk=post.pk, digest=digest), html,
+                  POST_BODY_CACHE_TIMEOUT)
+        self.put(post.pk, digest, html)
+
+    def evict(self, post):
+        cache.delete(BODY_KEY.format(pk=post.pk,
+                                     digest=body_digest(post.text)))
+        with self.lock:
+            entry = self.entries.pop(post.pk, None)
+            if entry is not None:
+                self.chars -= len(entry[1])
+
+    def put(self, pk, digest, html):
+        with self.lock:
+            old = self.entries.pop(pk, None)
+            if old is not None:
+                self.chars -= len(old[1])
+            self.entries[pk] = (digest, str(html))
+            self.chars += len(html)
+            while len(self.entries) > self.capacity:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.chars -= len(evicted)
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def stats(self):
+        with self.lock:
+            stats = {name: self.counters[name] for name in COUNTERS}
+            stats.update(entries=len(self.entries), chars=self.chars,
+                         capacity=self.capacity)
+        return stats
+
+    def maybe_publish(self):
+        now = time.monotonic()
+        if now - self.published >= POST_BODY_STATS_PUBLISH_SECONDS:
+            self.published = now
+            self.publish()
+
+    def publish(self):
+        """Копирует статистику процесса в кэш для post_body_cache_stats."""
+        publish_snapshot(STATS_PREFIX, self.stats(),
+                         POST_BODY_STATS_PUBLISH_SECONDS * 10)
+
+
+body_cache = BodyCache(POST_BODY_LRU_SIZE)
+
+
+def published_stats():
+    """Статистика всех процессов, опубликованная в кэш: {pid: stats}."""
+    return published_snapshots(STATS_PREFIX)
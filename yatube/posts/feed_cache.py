@@ -0,0 +1,128 @@
+import re
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.template.loader import render_to_string
+
+from core.snapshots import publish_snapshot, published_snapshots
+
+from .settings import FEED_CACHE_STATS_PUBLISH_SECONDS, FEED_CACHE_TIMEOUT
+
+FEED_VERSION_KEY = 'feed:version'
+FEED_PAGE_KEY = 'feed:index:{version}:{number}'
+STATS_PREFIX = 'feed:index:stats'
+GROUPS_PAGE_KEY = 'feed:groups:{version}:{sort}:{number}'
+PAGE_NUMBER = re.compile(r'[0-9]{1,9}')
+
+
+def _initial_version():
+    # Версия от времени: после вытеснения ключа не совпадёт со старыми
+    return int(time.time() * 1000)
+
+
+class FeedStats:
+    """Попадания в кэш страниц главной в этом процессе.
+
+    Раз в FEED_CACHE_STATS_PUBLISH_SECONDS счётчики вместе с версией
+    ленты уходят снимком в core.snapshots для feed_cache_stats.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = Counter()
+        self.published = 0.0
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+        now = time.monotonic()
+        if now - self.published >= FEED_CACHE_STATS_PUBLISH_SECONDS:
+            self.published = now
+            self.publish()
+
+    def publish(self):
+        with self.lock:
+            stats = {name: self.counters[name] for name in ('hits', 'misses')}
+        stats['version'] = cache.get(FEED_VERSION_KEY)
+        publish_snapshot(STATS_PREFIX, stats,
+                         FEED_CACHE_STATS_PUBLISH_SECONDS * 10)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+
+
+feed_stats = FeedStats()
+
+
+def get_feed_version():
+    version = cache.get(FEED_VERSION_KEY)
+    if version is None:
+        cache.add(FEED_VERSION_KEY, _initial_version(), None)
+        version = cache.get(FEED_VERSION_KEY)
+    return version
+
+
+def bump_feed_version():
+    """Делает все закэшированные страницы ленты устаревшими."""
+    try:
+        cache.incr(FEED_VERSION_KEY)
+    except ValueError:
+        cache.add(FEED_VERSION_KEY, _initial_version(), None)
+
+
+def render_index_feed(request, page_obj):
+    """Список постов главной из кэша или свежеотрисованный."""
+    template = 'posts/includes/index_feed.html'
+    context = {'page_obj': page_obj}
+    if page_obj.number is None:
+        # Страницы по курсору не кэшируем: их ключей слишком много
+        return render_to_string(template, context, request)
+    key = FEED_PAGE_KEY.format(
+        version=get_feed_version(), number=page_obj.number)
+    feed = cache.get(key)
+    if feed is not None:
+        feed_stats.count('hits')
+        return feed
+    feed_stats.count('misses')
+    # Фрагмент живёт до следующей записи: реплика могла ещё не получить
+    # её, поэтому страницу для кэша читаем из основной базы
+    page_obj.object_list = page_obj.object_list.using(DEFAULT_DB_ALIAS)
+    feed = render_to_string(template, context, request)
+    cache.set(key, feed, FEED_CACHE_TIMEOUT)
+    return feed
+
+
+def render_group_directory(request, sort, get_page):
+    """Страница каталога групп из кэша или свежеотрисованная.
+
+    get_page строит страницу только на промахе: подсчёт постов по всем
+    группам дорог, а версия ленты меняется при любой записи поста или
+    группы, так что закэшированная страница не отстаёт от базы.
+    """
+    page = request.GET.get('page', '')
+    key = GROUPS_PAGE_KEY.format(
+        version=get_feed_version(), sort=sort,
+        number=page if PAGE_NUMBER.fullmatch(page) else 1)
+    directory = cache.get(key)
+    if directory is None:
+        directory = render_to_string(
+            'posts/includes/group_directory.html',
+            {'page_obj': get_page(), 'page_query': f'sort={sort}&'},
+            request)
+        cache.set(key, directory, FEED_CACHE_TIMEOUT)
+    return directory
+
+
+def feed_cache_stats():
+    """Сумма снимков всех процессов; версия — самая новая из них."""
+    snapshots = list(published_snapshots(STATS_PREFIX).values())
+    return {
+        'version': max((stats['version'] for stats in snapshots
+                        if stats['version'] is not None), default=None),
+        'hits': sum(stats['hits'] for stats in snapshots),
+        'misses': sum(stats['misses'] for stats in snapshots),
+    }
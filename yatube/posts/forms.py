@@ -1,4 +1,5 @@
 from django import forms
+from django.core.exceptions import ValidationError
 
 from .models import Post
 
@@ -7,3 +8,35 @@ class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group')
+
+
+class PreloadedChoiceField(forms.ModelChoiceField):
+    """Выбор из заранее загруженного словаря {pk: объект} без запроса."""
+
+    preloaded = {}
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.preloaded[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(self.error_messages['invalid_choice'],
+                                  code='invalid_choice')
+
+
+class BatchPostForm(PostForm):
+    """PostForm для пакета: группы всех постов читаются одним запросом
+    заранее, а не запросом на каждый пост."""
+
+    class Meta(PostForm.Meta):
+        field_classes = {'group': PreloadedChoiceField}
+
+    def __init__(self, *args, groups, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['group'].preloaded = groups
+
+    def _get_validation_exclusions(self):
+        # Группу уже нашёл PreloadedChoiceField; ForeignKey.validate
+        # проверял бы её существование запросом на каждый пост
+        return super()._get_validation_exclusions() + ['group']
@@ -0,0 +1,68 @@
+"""Полнотекстовый индекс постов на SQLite FTS5.
+
+Внешний FTS5-индекс поверх posts_post: текст хранится один раз, а
+триггеры держат индекс в согласии с таблицей при любой записи.
+
+SQLite выполняет многие изменения схемы (например, AddField) через
+пересоздание таблицы, и триггеры posts_post при этом пропадают. Каждая
+такая миграция Post должна заканчиваться install_triggers.
+"""
+
+CREATE_TABLE_SQL = """
+    CREATE VIRTUAL TABLE posts_post_fts USING fts5(
+        text, content='posts_post', content_rowid='id'
+    )
+"""
+
+TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+]
+
+DROP_TRIGGERS_SQL = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+]
+
+REBUILD_SQL = "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')"
+
+
+def install_triggers(apps, schema_editor):
+    """Ставит триггеры заново и перестраивает индекс (для RunPython)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_TRIGGERS_SQL + TRIGGERS_SQL + [REBUILD_SQL]:
+        schema_editor.execute(statement)
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_TABLE_SQL)
+    install_triggers(apps, schema_editor)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_TRIGGERS_SQL:
+        schema_editor.execute(statement)
+    schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
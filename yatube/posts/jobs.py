@@ -0,0 +1,16 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from core.jobs import job
+
+from .models import Post
+from .timeline import fan_out
+
+
+@job('posts.fan_out')
+def fan_out_posts(author_id, post_ids):
+    """Раскладка новых постов по лентам подписчиков вне запроса записи.
+
+    Посты, удалённые до запуска задачи, просто не найдутся.
+    """
+    fan_out(author_id, list(Post.objects.using(DEFAULT_DB_ALIAS).filter(
+        pk__in=post_ids).only('pub_date')))
@@ -0,0 +1,27 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.related import build_related, update_related
+
+
+class Command(BaseCommand):
+    help = ('Ищет похожие посты по TF-IDF. По умолчанию добавляет в '
+            'индекс только новые посты; --full перестраивает индекс и '
+            'все списки, например раз в сутки, чтобы учесть правки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='перестроить индекс целиком')
+        parser.add_argument(
+            '--index',
+            default=os.path.join(settings.BASE_DIR, 'related_index.pickle'),
+            help='файл индекса')
+
+    def handle(self, *args, **options):
+        build = build_related if options['full'] else update_related
+        result = build(options['index'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Постов проиндексировано: {result["posts"]}, '
+            f'связей записано: {result["links"]}'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import compute_trending
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает популярные посты и группы для /trending/ от '
+            'прошлого запуска. Запускается по расписанию раз в несколько '
+            'минут, в один экземпляр.')
+
+    def handle(self, *args, **options):
+        result = compute_trending()
+        self.stdout.write(self.style.SUCCESS(
+            f'Событий: {result["events"]}, рейтингов: {result["scores"]}'))
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.models import Post, TrendingScore
+from posts.paginators import NEXT, PREVIOUS, CursorPaginator, encode_cursor
+from posts.settings import PAGINATOR_PAGE_SIZE
+
+# Признаки плохого плана в выводе EXPLAIN QUERY PLAN у SQLite
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def feed_queries():
+    """Запросы лент в том виде, в каком их выполняют представления."""
+    feeds = {
+        'index': Post.objects.for_feed(),
+        'group_list': Post.objects.for_feed().filter(group_id=1),
+        'profile': Post.objects.for_feed().filter(author_id=1),
+    }
+    sample = Post(pk=1, pub_date=timezone.now())
+    for name, posts in feeds.items():
+        paginator = CursorPaginator(posts, PAGINATOR_PAGE_SIZE)
+        yield name, posts[:PAGINATOR_PAGE_SIZE]
+        for direction in (NEXT, PREVIOUS):
+            _, page = paginator.page_queryset(
+                encode_cursor(direction, sample))
+            yield f'{name} ?cursor={direction}', page[:PAGINATOR_PAGE_SIZE]
+    yield 'trending', TrendingScore.objects.top(
+        TrendingScore.POST, PAGINATOR_PAGE_SIZE)
+
+
+def plan_problems(plan):
+    problems = []
+    for row in plan:
+        detail = row[-1]
+        if TEMP_SORT in detail:
+            problems.append(detail)
+        elif detail.startswith('SCAN') and 'USING' not in detail:
+            problems.append(detail)
+    return problems
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN QUERY PLAN для запросов лент и падает, '
+            'если какой-то из них читает таблицу целиком или сортирует '
+            'во временном B-дереве.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда поддерживает только SQLite.')
+        failed = []
+        with connection.cursor() as cursor:
+            for name, queryset in feed_queries():
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                problems = plan_problems(cursor.fetchall())
+                if problems:
+                    failed.append(name)
+                    self.stdout.write(self.style.ERROR(
+                        f'{name}: {"; ".join(problems)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'{name}: OK'))
+        if failed:
+            raise CommandError(
+                f'Плохой план у запросов: {", ".join(failed)}')
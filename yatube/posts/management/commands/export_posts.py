@@ -0,0 +1,124 @@
+import csv
+import json
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.models import Post
+
+FORMATS = ('jsonl', 'csv')
+# Те же поля, что понимает import_posts, плюс id для возобновления
+FIELDS = ('id', 'text', 'author', 'group', 'pub_date')
+
+
+def parse_date_option(value):
+    date = parse_datetime(value) or parse_datetime(f'{value}T00:00:00')
+    if date is None:
+        raise CommandError(f'Не удалось разобрать дату: {value}')
+    return timezone.make_aware(date) if timezone.is_naive(date) else date
+
+
+def iterate_keyset(posts, chunk_size, after=None):
+    """Обходит посты по (pub_date, id) страницами постоянного размера.
+
+    Каждая страница — один запрос по индексу, в памяти держится только
+    она, поэтому расход памяти не зависит от размера таблицы.
+    """
+    posts = posts.order_by('pub_date', 'id').values_list(
+        'id', 'text', 'author__username', 'group__slug', 'pub_date')
+    while True:
+        page = posts
+        if after is not None:
+            pub_date, pk = after
+            page = page.filter(
+                Q(pub_date__gt=pub_date) | Q(id__gt=pk),
+                pub_date__gte=pub_date,
+            )
+        rows = list(page[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        after = rows[-1][4], rows[-1][0]
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает посты в JSONL или CSV с постоянным '
+            'расходом памяти.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для записи или «-» для stdout; с --resume-after '
+                 'файл дописывается')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--group', help='slug группы')
+        parser.add_argument('--author', help='username автора')
+        parser.add_argument('--since', help='Не раньше даты (ISO 8601)')
+        parser.add_argument('--until', help='Раньше даты (ISO 8601)')
+        parser.add_argument(
+            '--resume-after', type=int, metavar='ID',
+            help='Продолжить после последнего выгруженного id')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть положительным.')
+        posts = Post.objects.all()
+        if options['group']:
+            posts = posts.filter(group__slug=options['group'])
+        if options['author']:
+            posts = posts.filter(author__username=options['author'])
+        if options['since']:
+            posts = posts.filter(
+                pub_date__gte=parse_date_option(options['since']))
+        if options['until']:
+            posts = posts.filter(
+                pub_date__lt=parse_date_option(options['until']))
+        after = None
+        if options['resume_after'] is not None:
+            last = Post.objects.filter(
+                pk=options['resume_after']).values_list('pub_date', 'pk')
+            if not last:
+                raise CommandError(
+                    f'Пост {options["resume_after"]} не найден.')
+            after = last[0]
+        resuming = after is not None
+        with self.open_output(options['output'], resuming) as stream:
+            exported, last_id = self.export(
+                iterate_keyset(posts, options['chunk_size'], after),
+                stream, options['format'], header=not resuming,
+            )
+        self.stderr.write(
+            f'Выгружено: {exported}, последний id: {last_id}')
+
+    @contextmanager
+    def open_output(self, path, append):
+        if path == '-':
+            yield self.stdout
+            return
+        mode = 'a' if append else 'w'
+        with open(path, mode, encoding='utf-8', newline='') as stream:
+            yield stream
+
+    def export(self, rows, stream, file_format, header):
+        if file_format == 'csv':
+            writer = csv.writer(stream)
+            if header:
+                writer.writerow(FIELDS)
+        exported = 0
+        last_id = None
+        for pk, text, author, group, pub_date in rows:
+            if file_format == 'csv':
+                writer.writerow(
+                    [pk, text, author, group or '', pub_date.isoformat()])
+            else:
+                stream.write(json.dumps({
+                    'id': pk, 'text': text, 'author': author,
+                    'group': group, 'pub_date': pub_date.isoformat(),
+                }, ensure_ascii=False) + '\n')
+            exported += 1
+            last_id = pk
+        return exported, last_id
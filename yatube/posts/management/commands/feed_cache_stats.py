@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.feed_cache import feed_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает версию ленты и попадания в кэш страниц главной.'
+
+    def handle(self, *args, **options):
+        stats = feed_cache_stats()
+        requests = stats['hits'] + stats['misses']
+        hit_rate = stats['hits'] / requests if requests else 0
+        self.stdout.write(
+            f'Версия ленты: {stats["version"]}\n'
+            f'Попадания: {stats["hits"]}\n'
+            f'Промахи: {stats["misses"]}\n'
+            f'Доля попаданий: {hit_rate:.1%}'
+        )
@@ -0,0 +1,132 @@
+import csv
+import json
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.feed_cache import bump_feed_version
+from posts.models import Group, Post, User
+from posts.signals import change_posts_count
+
+FORMATS = ('jsonl', 'csv')
+
+
+@contextmanager
+def preserve_pub_date():
+    """Отключает auto_now_add у pub_date и auto_now у updated_at.
+
+    Даты берутся из файла; updated_at ставится равной pub_date, иначе
+    compute_trending счёл бы каждый загруженный пост свежей правкой.
+    """
+    pub_date = Post._meta.get_field('pub_date')
+    updated_at = Post._meta.get_field('updated_at')
+    pub_date.auto_now_add = updated_at.auto_now = False
+    try:
+        yield
+    finally:
+        pub_date.auto_now_add = updated_at.auto_now = True
+
+
+class LookupCache:
+    """Ключ → id из базы; промахи тоже запоминаются."""
+
+    def __init__(self, queryset, field):
+        self.queryset = queryset
+        self.field = field
+        self.ids = {}
+
+    def __getitem__(self, key):
+        if key not in self.ids:
+            self.ids[key] = self.queryset.filter(
+                **{self.field: key}).values_list('pk', flat=True).first()
+        return self.ids[key]
+
+
+def read_rows(stream, file_format):
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает посты из JSONL или CSV (поля text, author, '
+            'group, pub_date) пачками через bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Путь к файлу или «-» для чтения из stdin')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        self.authors = LookupCache(User.objects, 'username')
+        self.groups = LookupCache(Group.objects, 'slug')
+        self.skipped = 0
+        if path == '-':
+            self.run(sys.stdin, file_format, options['batch_size'])
+        else:
+            with open(path, encoding='utf-8', newline='') as stream:
+                self.run(stream, file_format, options['batch_size'])
+
+    def run(self, stream, file_format, batch_size):
+        started = time.monotonic()
+        imported = Counter()
+        posts = self.to_posts(read_rows(stream, file_format))
+        with preserve_pub_date():
+            for batch in batched(posts, batch_size):
+                with transaction.atomic():
+                    Post.objects.bulk_create(batch)
+                imported.update(post.author_id for post in batch)
+        # bulk_create не шлёт сигналы: обновляем производные данные сами
+        for author_id, count in imported.items():
+            change_posts_count(author_id, count)
+        if imported:
+            bump_feed_version()
+        total = sum(imported.values())
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else total
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {total}, пропущено: {self.skipped}, '
+            f'{rate:.0f} строк/с'))
+
+    def to_posts(self, rows):
+        now = timezone.now()
+        for number, row in enumerate(rows, start=1):
+            author_id = self.authors[row.get('author')]
+            group_slug = row.get('group') or None
+            group_id = self.groups[group_slug] if group_slug else None
+            pub_date = parse_datetime(row.get('pub_date') or '') or now
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date)
+            if not row.get('text') or author_id is None or (
+                    group_slug and group_id is None):
+                self.skipped += 1
+                self.stderr.write(f'Строка {number} пропущена: {row}')
+                continue
+            yield Post(text=row['text'], author_id=author_id,
+                       group_id=group_id, pub_date=pub_date,
+                       updated_at=pub_date)
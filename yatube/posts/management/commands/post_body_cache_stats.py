@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts.body_cache import COUNTERS, published_stats
+
+
+class Command(BaseCommand):
+    help = ('Показывает размер LRU отрисованных текстов постов и долю '
+            'попаданий по процессам, опубликовавшим статистику в кэш.')
+
+    def handle(self, *args, **options):
+        stats = published_stats()
+        if not stats:
+            self.stdout.write('Статистики пока нет: процессы публикуют её '
+                              'раз в POST_BODY_STATS_PUBLISH_SECONDS.')
+            return
+        totals = dict.fromkeys(COUNTERS, 0)
+        for pid, process in stats.items():
+            self.stdout.write(
+                f'PID {pid}: {process["entries"]}/{process["capacity"]} '
+                f'записей, {process["chars"]} символов, '
+                f'LRU {process["lru_hits"]}, кэш {process["cache_hits"]}, '
+                f'промахи {process["misses"]}')
+            for name in COUNTERS:
+                totals[name] += process[name]
+        requests = sum(totals.values())
+        hits = totals['lru_hits'] + totals['cache_hits']
+        self.stdout.write(
+            f'Всего: LRU {totals["lru_hits"]}, кэш {totals["cache_hits"]}, '
+            f'промахи {totals["misses"]}, доля попаданий '
+            f'{hits / requests if requests else 0:.1%}')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import AuthorStats, User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов авторов и исправляет расхождения.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stored = {
+                stats.author_id: stats
+                for stats in AuthorStats.objects.select_for_update()
+            }
+            actual = dict(User.objects.annotate(
+                posts_count=Count('posts')).values_list('pk', 'posts_count'))
+            drifted = []
+            for author_id, posts_count in actual.items():
+                stats = stored.get(author_id)
+                if stats is not None and stats.posts_count != posts_count:
+                    stats.posts_count = posts_count
+                    drifted.append(stats)
+            AuthorStats.objects.bulk_update(drifted, ['posts_count'])
+            missing = [
+                AuthorStats(author_id=author_id, posts_count=posts_count)
+                for author_id, posts_count in actual.items()
+                if author_id not in stored
+            ]
+            AuthorStats.objects.bulk_create(missing)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено: {len(drifted)}, создано: {len(missing)}'))
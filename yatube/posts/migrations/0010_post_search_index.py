@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from posts import fts
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_author_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(fts.create_index, fts.drop_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:33
+
+from django.db import migrations, models
+from django.db.models import F
+
+from posts import fts
+
+
+def copy_pub_date(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.using(schema_editor.connection.alias).update(
+        updated_at=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_search_index'),
+    ]
+
+    operations = [
+        # Откат RemoveField тоже пересоздаёт таблицу: ставим триггеры после
+        migrations.RunPython(migrations.RunPython.noop, fts.install_triggers),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+        # AddField на SQLite пересоздаёт posts_post вместе с триггерами
+        migrations.RunPython(fts.install_triggers, migrations.RunPython.noop),
+    ]
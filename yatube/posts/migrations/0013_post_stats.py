@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('views_count', models.PositiveIntegerField(default=0, verbose_name='Просмотров')),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='posts.Post', verbose_name='Пост')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='poststats',
+            index=models.Index(fields=['-views_count', '-post'], name='post_stats_views_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Пост'), ('group', 'Группа')], max_length=5, verbose_name='Что')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id')),
+                ('score', models.FloatField(verbose_name='Рейтинг')),
+                ('computed_at', models.DateTimeField(verbose_name='Время расчёта')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='poststats',
+            name='recent_views',
+            field=models.PositiveIntegerField(default=0, verbose_name='Просмотров с прошлого расчёта популярности'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['updated_at'], name='post_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poststats',
+            index=models.Index(condition=models.Q(recent_views__gt=0), fields=['post'], name='post_stats_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trendingscore',
+            index=models.Index(fields=['kind', '-score'], name='trending_kind_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trendingscore',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='trending_kind_object_unique'),
+        ),
+    ]
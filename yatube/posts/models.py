@@ -1,18 +1,101 @@
-from django.db import models
+from itertools import islice
+
+from django.db import connections, models
+from django.db.models.query import ModelIterable
 from django.contrib.auth import get_user_model
 
+from .user_cache import attach_authors
+
 User = get_user_model()
 
+# Поля, которые шаблоны лент действительно выводят для каждого поста.
+# Автора ленты берут из кэша пользователей, а не JOIN-ом.
+FEED_FIELDS = (
+    'text', 'pub_date', 'author',
+    'group', 'group__slug', 'group__title',
+)
+
+
+class GroupQuerySet(models.QuerySet):
+    def directory(self):
+        """Группы с числом постов и датой последнего одним запросом.
+
+        Count и Max считаются по покрывающему индексу постов
+        (group, -pub_date, -id), не читая саму таблицу постов.
+        """
+        return self.values('title', 'id', 'slug').annotate(
+            posts_count=models.Count('posts'),
+            last_post_at=models.Max('posts__pub_date'),
+        )
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     slug = models.SlugField(unique=True)
 
+    objects = GroupQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
 
+class FeedIterable(ModelIterable):
+    """Посты с авторами из кэша пользователей: по пачке на chunk_size."""
+
+    def __iter__(self):
+        posts = super().__iter__()
+        while True:
+            chunk = list(islice(posts, self.chunk_size))
+            if not chunk:
+                return
+            attach_authors(chunk)
+            yield from chunk
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для лент: группа одним JOIN, без лишних колонок.
+
+        Авторы после загрузки подставляются из кэша пользователей;
+        values() и values_list() заменяют FeedIterable своим.
+        """
+        clone = self.select_related('group').only(*FEED_FIELDS)
+        clone._iterable_class = FeedIterable
+        return clone
+
+    def most_viewed(self):
+        """Посты по числу просмотров: проход по индексу счётчиков."""
+        # F по внешнему ключу — сама колонка post_id, без сортировки
+        # Post.Meta.ordering через лишний JOIN
+        return self.filter(stats__views_count__gt=0).order_by(
+            models.F('stats__views_count').desc(),
+            models.F('stats__post').desc())
+
+    def search(self, query):
+        """Посты по запросу, самые релевантные первыми.
+
+        На SQLite запрос идёт в FTS5-индекс posts_post_fts, на остальных
+        базах — обычный поиск по подстроке.
+        """
+        words = query.split()
+        if not words:
+            return self.none()
+        if connections[self.db].vendor != 'sqlite':
+            return self.filter(text__icontains=query)
+        # Каждое слово в кавычках: пользовательский ввод не ломает синтаксис
+        match = ' '.join(
+            '"{}"'.format(word.replace('"', '""')) for word in words)
+        return self.extra(
+            tables=['posts_post_fts'],
+            where=['posts_post_fts.rowid = posts_post.id',
+                   'posts_post_fts MATCH %s'],
+            params=[match],
+            select={'rank': 'bm25(posts_post_fts)'},
+            order_by=['rank'],
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
@@ -22,6 +105,10 @@ class Post(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -38,8 +125,237 @@ class Post(models.Model):
         help_text='Выберите группу'
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_pub_date_idx'),
+            # compute_trending читает правки с прошлого запуска
+            models.Index(fields=('updated_at',),
+                         name='post_updated_at_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Запоминаем автора, чтобы при смене перенести счётчик постов
+        post._loaded_author_id = post.__dict__.get('author_id')
+        return post
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Всего постов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0
+    )
+
+    def __str__(self):
+        return f'{self.author}: {self.posts_count}'
+
+
+class PostStats(models.Model):
+    """Денормализованные счётчики поста.
+
+    Просмотры копятся в памяти процесса (posts.view_counter) и
+    попадают сюда пакетами.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пост'
+    )
+    views_count = models.PositiveIntegerField(
+        verbose_name='Просмотров',
+        default=0
+    )
+    recent_views = models.PositiveIntegerField(
+        verbose_name='Просмотров с прошлого расчёта популярности',
+        default=0
+    )
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('-views_count', '-post'),
+                         name='post_stats_views_idx'),
+            # Частичный индекс: compute_trending читает только посты,
+            # которые смотрели с прошлого запуска
+            models.Index(fields=('post',), name='post_stats_recent_idx',
+                         condition=models.Q(recent_views__gt=0)),
+        )
+
+    def __str__(self):
+        return f'{self.post_id}: {self.views_count}'
+
+
+class RelatedPost(models.Model):
+    """Похожий пост по TF-IDF; списки строит build_related_posts."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='related_links',
+        verbose_name='Пост'
+    )
+    related = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий пост'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('post', 'related'),
+                                    name='related_post_unique'),
+        )
+        indexes = (
+            models.Index(fields=('post', '-score'),
+                         name='related_post_score_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.post_id} ~ {self.related_id}: {self.score:.2f}'
+
+
+class TrendingQuerySet(models.QuerySet):
+    def top(self, kind, limit):
+        """id самых популярных постов или групп по индексу (kind, -score)."""
+        return self.filter(kind=kind).order_by('-score').values_list(
+            'object_id', flat=True)[:limit]
+
+
+class TrendingScore(models.Model):
+    """Затухающая популярность поста или группы.
+
+    Таблицу целиком переписывает compute_trending: в ней рейтинги с
+    прошлого запуска, от которых считается следующий. /trending/ только
+    читает верх списка.
+    """
+    POST = 'post'
+    GROUP = 'group'
+    KINDS = (
+        (POST, 'Пост'),
+        (GROUP, 'Группа'),
+    )
+
+    kind = models.CharField(
+        verbose_name='Что',
+        max_length=5,
+        choices=KINDS
+    )
+    object_id = models.PositiveIntegerField(verbose_name='id')
+    score = models.FloatField(verbose_name='Рейтинг')
+    computed_at = models.DateTimeField(verbose_name='Время расчёта')
+
+    objects = TrendingQuerySet.as_manager()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('kind', 'object_id'),
+                                    name='trending_kind_object_unique'),
+        )
+        indexes = (
+            models.Index(fields=('kind', '-score'),
+                         name='trending_kind_score_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}: {self.score:.2f}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='follow_user_author_unique'),
+            models.CheckConstraint(check=~models.Q(user=models.F('author')),
+                                   name='follow_not_self'),
+        )
+
+    def __str__(self):
+        return f'{self.user} → {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок читателя.
+
+    Строки раскладываются при публикации поста, pub_date скопирована из
+    поста: страница ленты — один проход по индексу (user, -pub_date, -id)
+    без JOIN для сортировки.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='timeline_user_post_unique'),
+        )
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-id'),
+                         name='timeline_user_pub_date_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.user}: {self.post_id}'
+
+
+def get_posts_count(author):
+    """Число постов автора из счётчика, а если его нет — через COUNT."""
+    try:
+        return author.stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return author.posts.count()
+
+
+def get_views_count(post):
+    """Сохранённое в базе число просмотров поста."""
+    try:
+        return post.stats.views_count
+    except PostStats.DoesNotExist:
+        return 0
@@ -0,0 +1,102 @@
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'next'
+PREVIOUS = 'prev'
+
+
+def encode_cursor(direction, post):
+    raw = f'{direction}|{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, pub_date, id) или None для битого курсора."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(Page):
+    """Страница ленты, совместимая с шаблонами обычного Page."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self.object_list:
+            return None
+        return encode_cursor(NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.object_list:
+            return None
+        return encode_cursor(PREVIOUS, self.object_list[0])
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (pub_date, id) без COUNT и OFFSET.
+
+    Стоимость страницы постоянна: один запрос по индексу независимо
+    от того, насколько далеко читатель ушёл по ленте.
+    """
+
+    def get_page(self, cursor):
+        direction, posts = self.page_queryset(cursor)
+        rows = list(posts[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            if not rows:
+                # Новее курсора ничего нет (посты удалили): первая страница
+                return self.get_page(None)
+            rows.reverse()
+            return CursorPage(rows, self, has_next=True, has_previous=has_more)
+        return CursorPage(
+            rows, self,
+            has_next=has_more,
+            has_previous=direction == NEXT and bool(rows),
+        )
+
+    def page_queryset(self, cursor):
+        """Возвращает направление и запрос страницы для курсора."""
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            return None, self.object_list.order_by('-pub_date', '-pk')
+        direction, pub_date, pk = decoded
+        if direction == NEXT:
+            # Верхняя граница pub_date__lte даёт SQLite диапазон по индексу
+            return direction, self.object_list.filter(
+                Q(pub_date__lt=pub_date) | Q(pk__lt=pk),
+                pub_date__lte=pub_date,
+            ).order_by('-pub_date', '-pk')
+        return direction, self.object_list.filter(
+            Q(pub_date__gt=pub_date) | Q(pk__gt=pk),
+            pub_date__gte=pub_date,
+        ).order_by('pub_date', 'pk')
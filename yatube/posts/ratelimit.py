@@ -0,0 +1,52 @@
+import math
+import time
+
+from django.core.cache import cache
+
+LOCK_ATTEMPTS = 5
+LOCK_WAIT = .01
+
+
+class TokenBucket:
+    """Ограничитель «ведро с токенами» с состоянием в общем кэше.
+
+    В ведре до capacity токенов, оно пополняется со скоростью rate
+    токенов в секунду. Чтение и запись состояния идут под коротким
+    замком (cache.add), чтобы параллельные запросы одного пользователя
+    не потратили одни и те же токены дважды.
+    """
+
+    def __init__(self, prefix, capacity, rate):
+        self.prefix = prefix
+        self.capacity = capacity
+        self.rate = rate
+
+    def consume(self, identity, amount):
+        """Списывает amount токенов; возвращает (успех, секунд до повтора)."""
+        key = f'{self.prefix}:{identity}'
+        if not self.acquire(f'{key}:lock'):
+            return False, 1
+        try:
+            now = time.time()
+            tokens, updated = cache.get(key, (self.capacity, now))
+            tokens = min(self.capacity,
+                         tokens + (now - updated) * self.rate)
+            allowed = tokens >= amount
+            if allowed:
+                tokens -= amount
+            # Полное ведро можно не хранить: его вернёт значение по умолчанию
+            timeout = math.ceil((self.capacity - tokens) / self.rate) + 1
+            cache.set(key, (tokens, now), timeout)
+        finally:
+            cache.delete(f'{key}:lock')
+        if allowed:
+            return True, 0
+        return False, math.ceil((amount - tokens) / self.rate)
+
+    @staticmethod
+    def acquire(lock_key):
+        for _ in range(LOCK_ATTEMPTS):
+            if cache.add(lock_key, 1, 1):
+                return True
+            time.sleep(LOCK_WAIT)
+        return False
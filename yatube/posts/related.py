@@ -0,0 +1,184 @@
+import heapq
+import math
+import os
+import pickle
+import re
+import tempfile
+import zlib
+from collections import Counter, defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Post, RelatedPost
+from .settings import (RELATED_COMMON_MIN, RELATED_COMMON_RATIO,
+                       RELATED_FEATURES, RELATED_MIN_SCORE, RELATED_POSTS,
+                       RELATED_TERMS)
+
+WORD = re.compile(r'\w{2,}')
+
+
+def features(text):
+    """Хэшированный мешок слов: {номер корзины: сколько раз}.
+
+    crc32, а не hash(): номера должны совпадать между запусками.
+    """
+    return Counter(
+        zlib.crc32(word.encode()) % RELATED_FEATURES
+        for word in WORD.findall(text.lower()))
+
+
+class RelatedIndex:
+    """TF-IDF по хэшированным словам с обратным индексом.
+
+    Сходство — косинус нормированных векторов. Скалярные произведения
+    поста со всеми остальными (строка X·Xᵀ) считаются по обратному
+    индексу: обходятся только посты с общими словами. Индекс хранится
+    в файле, и новые посты добавляются в него без полной перестройки;
+    их IDF считается по частотам на момент добавления.
+    """
+
+    def __init__(self):
+        self.documents = 0
+        self.frequencies = Counter()
+        self.postings = defaultdict(list)
+        self.last_id = 0
+
+    def count(self, counts):
+        self.documents += 1
+        self.frequencies.update(counts.keys())
+
+    def vector(self, counts):
+        weights = {
+            feature: (1 + math.log(count)) * (1 + math.log(
+                (1 + self.documents) / (1 + self.frequencies[feature])))
+            for feature, count in counts.items()
+        }
+        top = heapq.nlargest(RELATED_TERMS, weights.items(),
+                             key=lambda item: item[1])
+        norm = math.sqrt(sum(weight * weight for _, weight in top))
+        return {feature: weight / norm for feature, weight in top} if (
+            norm) else {}
+
+    def add(self, post_id, vector):
+        for feature, weight in vector.items():
+            self.postings[feature].append((post_id, weight))
+        self.last_id = max(self.last_id, post_id)
+
+    def neighbors(self, post_id, vector):
+        """Самые похожие посты: [(сходство, id)] по убыванию."""
+        common = max(RELATED_COMMON_MIN,
+                     RELATED_COMMON_RATIO * self.documents)
+        scores = defaultdict(float)
+        for feature, weight in vector.items():
+            posting = self.postings.get(feature, ())
+            # Частое слово сходства почти не добавляет, а обход дорог
+            if len(posting) > common:
+                continue
+            for other, other_weight in posting:
+                scores[other] += weight * other_weight
+        scores.pop(post_id, None)
+        return heapq.nlargest(
+            RELATED_POSTS,
+            ((score, other) for other, score in scores.items()
+             if score >= RELATED_MIN_SCORE))
+
+    def save(self, path):
+        # Через временный файл: читатель не увидит недописанный индекс
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile(
+                dir=directory, delete=False) as file:
+            pickle.dump(self, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(file.name, path)
+
+    @staticmethod
+    def load(path):
+        try:
+            with open(path, 'rb') as file:
+                return pickle.load(file)
+        except FileNotFoundError:
+            return None
+
+
+def rows(related):
+    return [
+        RelatedPost(post_id=post_id, related_id=other, score=score)
+        for post_id, neighbors in related.items()
+        for score, other in neighbors
+    ]
+
+
+def merge(*neighbors):
+    """Лучшие RELATED_POSTS соседей без повторов одного поста."""
+    best = {}
+    for score, other in (pair for group in neighbors for pair in group):
+        best[other] = max(score, best.get(other, score))
+    return heapq.nlargest(
+        RELATED_POSTS, ((score, other) for other, score in best.items()))
+
+
+def build_related(path):
+    """Строит индекс по всем постам и заново пишет RelatedPost."""
+    db = DEFAULT_DB_ALIAS
+    index = RelatedIndex()
+    counted = []
+    for pk, text in Post.objects.using(db).order_by('pk').values_list(
+            'pk', 'text').iterator():
+        counts = features(text)
+        index.count(counts)
+        counted.append((pk, counts))
+    vectors = [(pk, index.vector(counts)) for pk, counts in counted]
+    for pk, vector in vectors:
+        index.add(pk, vector)
+    related = {pk: index.neighbors(pk, vector) for pk, vector in vectors}
+    with transaction.atomic(using=db):
+        RelatedPost.objects.using(db).all().delete()
+        RelatedPost.objects.using(db).bulk_create(rows(related))
+    index.save(path)
+    return {'posts': len(vectors), 'links': sum(map(len, related.values()))}
+
+
+def update_related(path):
+    """Добавляет в индекс посты новее last_id.
+
+    Новый пост получает своих соседей, а у соседей он вытесняет
+    менее похожие посты. Правки старых постов учтёт полная перестройка.
+    Файл индекса сохраняется после транзакции: если процесс упал между
+    ними, следующий запуск повторит те же посты, поэтому строки
+    затронутых постов заменяются целиком, а соседи сливаются без повторов.
+    """
+    index = RelatedIndex.load(path)
+    if index is None:
+        return build_related(path)
+    db = DEFAULT_DB_ALIAS
+    related = {}
+    for pk, text in Post.objects.using(db).filter(
+            pk__gt=index.last_id).order_by('pk').values_list('pk', 'text'):
+        counts = features(text)
+        index.count(counts)
+        vector = index.vector(counts)
+        related[pk] = index.neighbors(pk, vector)
+        index.add(pk, vector)
+    # Удалённые посты остаются в индексе до перестройки: пропускаем их
+    existing = set(Post.objects.using(db).filter(pk__in={
+        other for neighbors in related.values() for _, other in neighbors
+    }).values_list('pk', flat=True)) | related.keys()
+    candidates = defaultdict(list)
+    for pk, neighbors in related.items():
+        related[pk] = [(score, other) for score, other in neighbors
+                       if other in existing]
+        for score, other in related[pk]:
+            if other not in related:
+                candidates[other].append((score, pk))
+    with transaction.atomic(using=db):
+        stored = defaultdict(list)
+        for post_id, other, score in RelatedPost.objects.using(db).filter(
+                post_id__in=candidates).values_list(
+                    'post_id', 'related_id', 'score'):
+            stored[post_id].append((score, other))
+        for post_id, new in candidates.items():
+            related[post_id] = merge(stored[post_id], new)
+        RelatedPost.objects.using(db).filter(post_id__in=related).delete()
+        RelatedPost.objects.using(db).bulk_create(rows(related))
+    index.save(path)
+    return {'posts': len(related) - len(candidates),
+            'links': sum(map(len, related.values()))}
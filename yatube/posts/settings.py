@@ -1 +1,61 @@
 PAGINATOR_PAGE_SIZE = 10
+# Сколько живёт закэшированный фрагмент ленты: устаревшие версии
+# больше никто не читает, и кэш вытесняет их сам
+FEED_CACHE_TIMEOUT = 60 * 15
+# Как часто процесс публикует попадания в кэш главной для feed_cache_stats
+FEED_CACHE_STATS_PUBLISH_SECONDS = 30
+# HTML текстов постов: сколько держит LRU каждого процесса и сколько
+# живёт запись в общем кэше (ключ меняется вместе с текстом)
+POST_BODY_LRU_SIZE = 2000
+POST_BODY_CACHE_TIMEOUT = 60 * 60 * 24
+POST_BODY_STATS_PUBLISH_SECONDS = 30
+# Пакетное создание постов: размер пакета и ведро токенов на
+# пользователя — всплеск до POST_BATCH_BURST постов, дальше
+# POST_BATCH_RATE постов в секунду
+POST_BATCH_MAX_SIZE = 100
+POST_BATCH_BURST = 200
+POST_BATCH_RATE = 2
+# Сколько живут в кэше имя и id пользователя; при правке пользователя
+# запись удаляется сразу
+USER_CACHE_TIMEOUT = 60 * 60
+# Лента подписок: посты авторов, у которых подписчиков не больше
+# TIMELINE_FANOUT_MAX_FOLLOWERS, раскладываются по лентам при публикации
+# пакетами по TIMELINE_FANOUT_BATCH_SIZE строк. Посты популярных авторов
+# читатель подтягивает сам, не чаще раза в TIMELINE_PULL_SECONDS и не
+# больше TIMELINE_PULL_LIMIT за раз. Новая подписка сразу приносит
+# TIMELINE_BACKFILL_SIZE последних постов автора.
+TIMELINE_FANOUT_MAX_FOLLOWERS = 1000
+TIMELINE_FANOUT_BATCH_SIZE = 500
+TIMELINE_PULL_SECONDS = 30
+TIMELINE_PULL_LIMIT = 100
+TIMELINE_BACKFILL_SIZE = 100
+# Просмотры постов копятся в памяти процесса и уходят в базу одним
+# UPDATE раз в POST_VIEWS_FLUSH_SECONDS (срок проверяется на очередном
+# просмотре) или после POST_VIEWS_FLUSH_THRESHOLD просмотров, а также
+# при выходе процесса, по POST_VIEWS_FLUSH_CHUNK
+# постов в запросе: CASE для двух счётчиков — пять параметров на пост,
+# а старые SQLite принимают не больше 999
+POST_VIEWS_FLUSH_SECONDS = 10
+POST_VIEWS_FLUSH_THRESHOLD = 500
+POST_VIEWS_FLUSH_CHUNK = 150
+# Популярное: вес событий и период полураспада рейтинга в часах.
+# Первый расчёт берёт события за TRENDING_WINDOW_HOURS; между
+# запусками хранится не больше TRENDING_STATE_SIZE рейтингов каждого
+# вида не меньше TRENDING_MIN_SCORE, /trending/ показывает первые
+# TRENDING_TOP
+TRENDING_WEIGHTS = {'post': 5.0, 'edit': 1.0, 'view': 0.2}
+TRENDING_HALF_LIFE_HOURS = 6
+TRENDING_WINDOW_HOURS = 72
+TRENDING_STATE_SIZE = 1000
+TRENDING_MIN_SCORE = 0.01
+TRENDING_TOP = 10
+# Похожие посты: сколько хранить и показывать на пост, число корзин
+# хэшированного мешка слов и сколько самых весомых слов поста брать.
+# Слово, которое встречается больше чем в max(RELATED_COMMON_MIN,
+# RELATED_COMMON_RATIO * постов) постах, кандидатов не ищет
+RELATED_POSTS = 5
+RELATED_FEATURES = 2 ** 20
+RELATED_TERMS = 64
+RELATED_COMMON_RATIO = .01
+RELATED_COMMON_MIN = 50
+RELATED_MIN_SCORE = .05
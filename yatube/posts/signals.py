@@ -0,0 +1,109 @@
+from django.db import router
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.jobs import enqueue
+
+from .body_cache import body_cache
+from .feed_cache import bump_feed_version
+from .models import AuthorStats, Follow, Group, Post, User
+from .timeline import backfill, bump_follows_version, drop
+from .user_cache import forget_user
+
+
+def change_stats(author_id, field, delta):
+    # Пересчёт — часть записи: читаем основную базу, а не реплику
+    db = router.db_for_write(AuthorStats)
+    updated = AuthorStats.objects.using(db).filter(author_id=author_id).update(
+        **{field: F(field) + delta})
+    if not updated:
+        # Счётчиков ещё нет: заводим их сразу с точными значениями
+        AuthorStats.objects.using(db).get_or_create(
+            author_id=author_id,
+            defaults={
+                'posts_count': Post.objects.using(db).filter(
+                    author_id=author_id).count(),
+                'followers_count': Follow.objects.using(db).filter(
+                    author_id=author_id).count(),
+            },
+        )
+
+
+def change_posts_count(author_id, delta):
+    change_stats(author_id, 'posts_count', delta)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded_author_id = getattr(instance, '_loaded_author_id', None)
+    if created:
+        change_posts_count(instance.author_id, 1)
+    elif loaded_author_id and loaded_author_id != instance.author_id:
+        change_posts_count(loaded_author_id, -1)
+        change_posts_count(instance.author_id, 1)
+    instance._loaded_author_id = instance.author_id
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    AuthorStats.objects.filter(author_id=instance.author_id).update(
+        posts_count=F('posts_count') - 1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    # Подписчиков могут быть тысячи: раскладывает воркер после фиксации
+    if created and not raw:
+        enqueue('posts.fan_out', instance.author_id, [instance.pk])
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_stats(instance.author_id, 'followers_count', 1)
+        backfill(instance.user_id, instance.author_id)
+        bump_follows_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    AuthorStats.objects.filter(author_id=instance.author_id).update(
+        followers_count=F('followers_count') - 1)
+    drop(instance.user_id, instance.author_id)
+    bump_follows_version(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+def refresh_post_body(sender, instance, raw=False, **kwargs):
+    if not raw:
+        body_cache.store(instance)
+
+
+@receiver(post_delete, sender=Post)
+def evict_post_body(sender, instance, **kwargs):
+    body_cache.evict(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_feed(sender, **kwargs):
+    bump_feed_version()
+
+
+@receiver(post_save, sender=User)
+def invalidate_feed_on_user_change(sender, instance, update_fields=None,
+                                   **kwargs):
+    # Вход пользователя сохраняет только last_login — ленту он не меняет
+    if update_fields != frozenset({'last_login'}):
+        forget_user(instance)
+        bump_feed_version()
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user(sender, instance, **kwargs):
+    forget_user(instance)
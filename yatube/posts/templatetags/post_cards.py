@@ -0,0 +1,54 @@
+from functools import lru_cache
+from urllib.parse import quote
+
+from django import template
+from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils.http import RFC3986_SUBDELIMS
+
+from ..body_cache import body_cache
+
+register = template.Library()
+
+# Подходит под конвертеры int, slug и str
+PLACEHOLDER = '9876543210'
+SAFE_CHARS = RFC3986_SUBDELIMS + '/~:@'
+
+
+@lru_cache(maxsize=None)
+def url_template(name, urlconf, script_prefix):
+    """Разворачивает URL один раз и делит его на части вокруг аргумента."""
+    prefix, _, suffix = reverse(
+        name, urlconf, args=[PLACEHOLDER]).partition(PLACEHOLDER)
+    return prefix, suffix
+
+
+def fast_reverse(name, value):
+    """reverse() для URL с одним аргументом без обхода резолвера."""
+    prefix, suffix = url_template(name, get_urlconf(), get_script_prefix())
+    return f'{prefix}{quote(str(value), safe=SAFE_CHARS)}{suffix}'
+
+
+@register.inclusion_tag('posts/includes/post_card.html')
+def post_card(post, show_group=True, show_detail=True):
+    """Карточка поста для лент.
+
+    Ссылки и имя автора готовятся здесь, чтобы шаблон карточки не
+    разворачивал URL на каждый пост; HTML текста берётся из body_cache.
+    """
+    group = post.group if show_group else None
+    return {
+        'post': post,
+        'author_name': post.author.get_full_name(),
+        'author_url': fast_reverse('posts:profile', post.author.username),
+        'text': body_cache.get(post),
+        'group': group,
+        'group_url': group and fast_reverse('posts:group_list', group.slug),
+        'detail_url': show_detail and fast_reverse(
+            'posts:post_detail', post.pk),
+    }
+
+
+@register.filter
+def post_body(post):
+    """Текст поста с переносами строк из кэша отрисованных текстов."""
+    return body_cache.get(post)
@@ -0,0 +1,283 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..body_cache import body_cache
+from ..models import (AuthorStats, Group, Post, PostStats, RelatedPost,
+                      TrendingScore, User)
+from ..settings import TRENDING_HALF_LIFE_HOURS
+from ..view_counter import ViewCounter
+
+
+class ExplainFeedsCommandTests(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не читают таблицу целиком и не сортируют."""
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        self.assertNotIn('TEMP B-TREE', out.getvalue())
+
+
+class RecountPostsCommandTests(TestCase):
+    def test_recount_repairs_drift(self):
+        author = User.objects.create_user(username='auth')
+        Post.objects.create(author=author, text='Тест')
+        AuthorStats.objects.filter(author=author).update(posts_count=42)
+        Post.objects.bulk_create([Post(author=author, text='Без сигналов')])
+        call_command('recount_posts', stdout=StringIO())
+        self.assertEqual(
+            AuthorStats.objects.get(author=author).posts_count, 2)
+
+
+class PostBodyCacheStatsCommandTests(TestCase):
+    def test_reports_published_stats(self):
+        caches['snapshots'].clear()
+        body_cache.publish()
+        out = StringIO()
+        call_command('post_body_cache_stats', stdout=out)
+        self.assertIn(f'/{body_cache.capacity} записей', out.getvalue())
+        self.assertIn('доля попаданий', out.getvalue())
+
+
+class ComputeTrendingCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='')
+        cls.quiet = Post.objects.create(author=cls.author, text='Тихий')
+        cls.viewed = Post.objects.create(
+            author=cls.author, text='Популярный', group=cls.group)
+
+    def scores(self, kind):
+        return dict(TrendingScore.objects.filter(kind=kind).values_list(
+            'object_id', 'score'))
+
+    def test_views_rank_posts_and_groups(self):
+        counter = ViewCounter(interval=3600, threshold=1000)
+        for _ in range(30):
+            counter.hit(self.viewed.pk)
+        counter.flush()
+        call_command('compute_trending', stdout=StringIO())
+        self.assertEqual(
+            list(TrendingScore.objects.top(TrendingScore.POST, 10)),
+            [self.viewed.pk, self.quiet.pk])
+        self.assertEqual(list(self.scores(TrendingScore.GROUP)),
+                         [self.group.pk])
+        # Просмотры забраны: второй расчёт их не удвоит
+        self.assertEqual(PostStats.objects.get(
+            post=self.viewed).recent_views, 0)
+        self.assertEqual(PostStats.objects.get(
+            post=self.viewed).views_count, 30)
+
+    def test_incremental_run_only_decays_old_scores(self):
+        now = timezone.now()
+        trending.compute_trending(now)
+        first = self.scores(TrendingScore.POST)
+        # Рейтинги, новые посты, правки, просмотры и перезапись таблицы
+        with self.assertNumQueries(8):
+            trending.compute_trending(
+                now + timedelta(hours=TRENDING_HALF_LIFE_HOURS))
+        for pk, score in self.scores(TrendingScore.POST).items():
+            self.assertAlmostEqual(score, first[pk] / 2)
+
+    def test_decayed_totals_halve_per_half_life(self):
+        self.assertEqual(dict(trending.decayed_totals(
+            [4, 4, 3], [1.0, 2.0, 5.0], [0, 3600, 7200], 3600)),
+            {4: 2.0, 3: 1.25})
+
+
+class BuildRelatedPostsCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.cats = Post.objects.create(
+            author=cls.author, text='Кошки спят на тёплом подоконнике')
+        cls.more_cats = Post.objects.create(
+            author=cls.author, text='Почему кошки любят подоконник')
+        cls.python = Post.objects.create(
+            author=cls.author, text='Списки и словари в Python')
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index = os.path.join(self.directory.name, 'index.pickle')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def related(self, post):
+        return list(RelatedPost.objects.filter(post=post).order_by(
+            '-score').values_list('related', flat=True))
+
+    def build(self, *args):
+        call_command('build_related_posts', '--index', self.index, *args,
+                     stdout=StringIO())
+
+    def test_full_build_links_similar_posts(self):
+        self.build('--full')
+        self.assertEqual(self.related(self.cats), [self.more_cats.pk])
+        self.assertEqual(self.related(self.python), [])
+
+    def test_new_posts_added_incrementally(self):
+        self.build()
+        newer = Post.objects.create(
+            author=self.author, text='Кошки и снова кошки на подоконнике')
+        self.more_cats.delete()
+        with mock.patch('posts.related.build_related') as build:
+            self.build()
+        build.assert_not_called()
+        self.assertEqual(self.related(newer), [self.cats.pk])
+        self.assertEqual(self.related(self.cats), [newer.pk])
+
+    def test_rerun_after_crash_before_index_save(self):
+        self.build()
+        newer = Post.objects.create(
+            author=self.author, text='Кошки и снова кошки на подоконнике')
+        with mock.patch('posts.related.RelatedIndex.save',
+                        side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.build()
+        self.build()
+        cats = set(Post.objects.filter(text__contains='ошки').values_list(
+            'pk', flat=True))
+        self.assertEqual(set(self.related(newer)), cats - {newer.pk})
+        self.assertEqual(set(self.related(self.cats)), cats - {self.cats.pk})
+
+    def test_detail_shows_related_posts(self):
+        self.build()
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.cats.pk}))
+        self.assertEqual(list(response.context['related']),
+                         [(self.more_cats.pk, self.more_cats.text)])
+
+    def test_related_update_changes_post_etag(self):
+        self.build()
+        url = reverse('posts:post_detail', kwargs={'post_id': self.cats.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # Полная перестройка: те же посты, но блок записан заново
+        self.build('--full')
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ImportPostsCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def import_file(self, suffix, content, *args):
+        with tempfile.NamedTemporaryFile(
+                'w', suffix=suffix, encoding='utf-8', delete=False) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        call_command('import_posts', file.name, *args,
+                     stdout=StringIO(), stderr=StringIO())
+
+    def test_import_jsonl_keeps_dates(self):
+        rows = [
+            {'text': 'Старый пост', 'author': 'auth', 'group': 'test-slug',
+             'pub_date': '2015-03-01T10:00:00+00:00'},
+            {'text': 'Без группы', 'author': 'auth'},
+            {'text': 'Чужой', 'author': 'nobody'},
+            {'text': 'Нет группы', 'author': 'auth', 'group': 'missing'},
+        ]
+        self.import_file(
+            '.jsonl', '\n'.join(json.dumps(row) for row in rows),
+            '--batch-size', '1')
+        self.assertEqual(Post.objects.count(), 2)
+        old = Post.objects.get(text='Старый пост')
+        self.assertEqual(old.pub_date.year, 2015)
+        self.assertEqual(old.group, self.group)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).posts_count, 2)
+        self.assertEqual(old.updated_at, old.pub_date)
+        # После загрузки auto_now_add и auto_now снова работают
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+        self.assertTrue(Post._meta.get_field('updated_at').auto_now)
+
+    def test_imported_old_posts_do_not_trend(self):
+        self.import_file('.jsonl', json.dumps(
+            {'text': 'Архив', 'author': 'auth', 'group': 'test-slug',
+             'pub_date': '2020-01-01T00:00:00+00:00'}))
+        self.assertEqual(trending.compute_trending()['events'], 0)
+        self.assertFalse(TrendingScore.objects.exists())
+
+    def test_import_csv(self):
+        self.import_file(
+            '.csv',
+            'text,author,group,pub_date\n'
+            'Первый,auth,test-slug,2020-01-01 12:00\n'
+            'Второй,auth,,\n')
+        self.assertEqual(
+            set(Post.objects.values_list('text', flat=True)),
+            {'Первый', 'Второй'})
+        self.assertEqual(self.group.posts.count(), 1)
+
+
+class ExportPostsCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {number}',
+                 group=cls.group if number % 2 else None)
+            for number in range(7)
+        )
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_posts', '--chunk-size', '2', *args,
+                     stdout=out, stderr=StringIO())
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_export_walks_all_posts_in_order(self):
+        rows = self.export()
+        self.assertEqual(
+            [row['id'] for row in rows],
+            list(Post.objects.order_by('pub_date', 'id')
+                 .values_list('id', flat=True)))
+        self.assertEqual(rows[0]['author'], 'auth')
+
+    def test_export_filters_and_resumes(self):
+        rows = self.export('--group', 'test-slug')
+        self.assertEqual(len(rows), 3)
+        resumed = self.export('--resume-after', str(rows[0]['id']),
+                              '--group', 'test-slug')
+        self.assertEqual(resumed, rows[1:])
+        self.assertEqual(self.export('--since', '2000-01-01',
+                                     '--until', '2001-01-01'), [])
+
+    def test_export_csv_can_be_imported(self):
+        out = StringIO()
+        call_command('export_posts', '--format', 'csv',
+                     stdout=out, stderr=StringIO())
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(set(rows[0]), {'id', 'text', 'author', 'group',
+                                        'pub_date'})
@@ -1,10 +1,19 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
+from django.utils import timezone
 from django import forms
 
-from ..models import Group, Post, User
+from core.models import Job
+
+from ..models import AuthorStats, Group, Post, User
+from ..settings import POST_BATCH_BURST
 
 CREATION_URL = reverse('posts:post_create')
+BATCH_URL = reverse('posts:post_batch_create')
 PROFILE_USER = reverse('posts:profile',
                        kwargs={'username': 'auth'})
 
@@ -133,3 +142,94 @@ class PostCreateFormTests(TestCase):
                 with self.subTest(value=value):
                     form_field = response.context['form'].fields[value]
                     self.assertIsInstance(form_field, expected)
+
+
+class PostBatchCreateTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def send(self, posts, client=None):
+        return (client or self.client).post(
+            BATCH_URL, json.dumps({'posts': posts}),
+            content_type='application/json')
+
+    def test_valid_posts_created_and_errors_reported(self):
+        response = self.send([
+            {'text': 'Первый', 'group': self.group.pk},
+            {'text': ''},
+            {'text': 'Второй'},
+            {'text': 'Чужая группа', 'group': 999},
+        ])
+        data = response.json()
+        self.assertEqual(data['created'], 2)
+        self.assertEqual([result['index'] for result in data['results']],
+                         [0, 1, 2, 3])
+        self.assertIn('text', data['results'][1]['errors'])
+        self.assertIn('group', data['results'][3]['errors'])
+        first = Post.objects.get(pk=data['results'][0]['id'])
+        self.assertEqual((first.text, first.group), ('Первый', self.group))
+        self.assertEqual(
+            Post.objects.get(pk=data['results'][2]['id']).text, 'Второй')
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).posts_count, 2)
+
+    def test_batch_inserted_in_few_queries(self):
+        posts = [{'text': f'Пост {number}'} for number in range(50)]
+        self.send(posts[:1])
+        # Сессия, пользователь, транзакция с вставкой, id, счётчиком
+        # и задачей раскладки по лентам
+        with self.assertNumQueries(8):
+            self.send(posts)
+        self.assertEqual(Post.objects.count(), 51)
+
+    def test_groups_checked_in_one_query(self):
+        posts = [{'text': f'Пост {number}', 'group': self.group.pk}
+                 for number in range(50)]
+        self.send(posts[:1])
+        with self.assertNumQueries(9):
+            response = self.send(posts)
+        self.assertEqual(response.json()['created'], 50)
+        self.assertEqual(Post.objects.filter(group=self.group).count(), 51)
+
+    def test_ids_read_back_past_older_twin(self):
+        moment = timezone.now()
+        with mock.patch('django.utils.timezone.now', return_value=moment):
+            twin = Post.objects.create(author=self.author, text='Пост')
+            data = self.send([{'text': 'Пост'}, {'text': 'Другой'}]).json()
+        ids = [result['id'] for result in data['results']]
+        self.assertNotIn(None, ids)
+        self.assertNotIn(twin.pk, ids)
+        self.assertEqual(
+            list(Post.objects.filter(pk__in=ids).order_by('pk').values_list(
+                'text', flat=True)), ['Пост', 'Другой'])
+        self.assertEqual(json.loads(Job.objects.latest('pk').arguments)[
+            'args'], [self.author.pk, ids])
+
+    def test_token_bucket_limits_bursts(self):
+        posts = [{'text': 'Пост'}] * 100
+        for _ in range(POST_BATCH_BURST // len(posts)):
+            self.assertEqual(self.send(posts).status_code, 200)
+        response = self.send(posts)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        other = User.objects.create_user(username='other')
+        client = Client()
+        client.force_login(other)
+        self.assertEqual(self.send(posts, client).status_code, 200)
+
+    def test_rejects_guests_and_bad_payloads(self):
+        self.assertEqual(self.send([{'text': 'Пост'}], Client()).status_code,
+                         401)
+        response = self.client.post(BATCH_URL, 'не json',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.send([{'text': 'Пост'}] * 101).status_code,
+                         400)
+        self.assertFalse(Post.objects.exists())
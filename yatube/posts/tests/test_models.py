@@ -1,6 +1,7 @@
+from django.core.cache import cache
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import Group, Post, User, get_posts_count
 
 
 class PostModelTest(TestCase):
@@ -38,6 +39,24 @@ class PostModelTest(TestCase):
                     Post._meta.get_field(field).verbose_name,
                     expected_value)
 
+    def test_feed_posts_get_authors_from_cache(self):
+        """Автор ленты приходит из кэша при любом способе чтения."""
+        cache.clear()
+        list(Post.objects.for_feed())
+        reads = {
+            'list': lambda posts: list(posts),
+            'iterator': lambda posts: list(posts.iterator(chunk_size=1)),
+            'slice': lambda posts: list(posts.filter(group=None)[:1]),
+        }
+        for name, read in reads.items():
+            with self.subTest(read=name):
+                with self.assertNumQueries(1):
+                    post, = read(Post.objects.for_feed())
+                    self.assertEqual(post.author.username, 'auth')
+        self.assertEqual(
+            list(Post.objects.for_feed().values_list('text', flat=True)),
+            ['Тестовая надпись'])
+
     def test_help_text(self):
         """help_text в полях совпадает с ожидаемым."""
         field_help_texts = {
@@ -48,3 +67,27 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     Post._meta.get_field(field).help_text, expected_value)
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+
+    def posts_count(self, user):
+        return get_posts_count(User.objects.get(pk=user.pk))
+
+    def test_posts_count_follows_writes(self):
+        """Счётчик постов меняется при создании, смене автора и удалении."""
+        post = Post.objects.create(author=self.user, text='Первый')
+        Post.objects.create(author=self.user, text='Второй')
+        self.assertEqual(self.posts_count(self.user), 2)
+        post = Post.objects.get(pk=post.pk)
+        post.author = self.other
+        post.save()
+        self.assertEqual(self.posts_count(self.user), 1)
+        self.assertEqual(self.posts_count(self.other), 1)
+        post.delete()
+        self.assertEqual(self.posts_count(self.other), 0)
@@ -14,7 +14,17 @@ class TestsRoutes(TestCase):
             ['profile', {'username': USERNAME}, f'/profile/{USERNAME}/'],
             ['post_detail', {'post_id': POST_ID}, f'/posts/{POST_ID}/'],
             ['group_list', {'slug': SLUG}, f'/group/{SLUG}/'],
+            ['group_index', '', '/groups/'],
             ['post_create', '', '/create/'],
+            ['post_batch_create', '', '/create/batch/'],
+            ['profile_follow', {'username': USERNAME},
+             f'/profile/{USERNAME}/follow/'],
+            ['profile_unfollow', {'username': USERNAME},
+             f'/profile/{USERNAME}/unfollow/'],
+            ['follow_index', '', '/follow/'],
+            ['popular', '', '/popular/'],
+            ['trending', '', '/trending/'],
+            ['search', '', '/search/'],
             ['post_edit', {'post_id': POST_ID}, f'/posts/{POST_ID}/edit/']
         ]
         for name_route, params, url in urls:
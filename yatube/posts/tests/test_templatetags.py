@@ -0,0 +1,31 @@
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..templatetags.post_cards import fast_reverse, post_card
+
+
+class PostCardTests(SimpleTestCase):
+    def test_fast_reverse_matches_reverse(self):
+        """Готовые URL совпадают с reverse(), в том числе с экранированием."""
+        cases = (
+            ('posts:profile', 'leo.tolstoy+1@ya'),
+            ('posts:profile', 'лев'),
+            ('posts:group_list', 'classic-novels'),
+            ('posts:post_detail', 42),
+        )
+        for name, value in cases:
+            with self.subTest(name=name, value=value):
+                self.assertEqual(
+                    fast_reverse(name, value), reverse(name, args=[value]))
+
+    def test_card_context(self):
+        author = User(username='leo', first_name='Лев', last_name='Толстой')
+        post = Post(pk=7, author=author, text='<b>Раз</b>\nДва',
+                    group=Group(slug='classic', title='Классика'))
+        card = post_card(post, show_detail=False)
+        self.assertEqual(card['author_name'], 'Лев Толстой')
+        self.assertEqual(card['text'], '&lt;b&gt;Раз&lt;/b&gt;<br>Два')
+        self.assertEqual(card['group_url'], '/group/classic/')
+        self.assertFalse(card['detail_url'])
+        self.assertIsNone(post_card(post, show_group=False)['group'])
@@ -1,8 +1,21 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import DatabaseError
 from django.test import Client, TestCase
 from django.urls import reverse
+from django.utils import timezone
 
+from ..body_cache import BodyCache
+from ..feed_cache import feed_cache_stats, feed_stats
 from ..settings import PAGINATOR_PAGE_SIZE
-from ..models import Group, Post, User
+from ..models import (AuthorStats, Follow, Group, Post, PostStats,
+                      TimelineEntry, TrendingScore, User)
+from ..paginators import PREVIOUS, CursorPaginator, encode_cursor
+from ..view_counter import ViewCounter, view_counter
 
 MAIN_URL = reverse('posts:index')
 CREATE_URL = reverse('posts:post_create')
@@ -12,6 +25,15 @@ GROUP_2_URL = reverse('posts:group_list',
                       kwargs={'slug': 'test-slug2'})
 PROFILE_URL = reverse('posts:profile',
                       kwargs={'username': 'auth'})
+SEARCH_URL = reverse('posts:search')
+GROUPS_URL = reverse('posts:group_index')
+POPULAR_URL = reverse('posts:popular')
+TRENDING_URL = reverse('posts:trending')
+FOLLOW_INDEX_URL = reverse('posts:follow_index')
+FOLLOW_URL = reverse('posts:profile_follow',
+                     kwargs={'username': 'auth'})
+UNFOLLOW_URL = reverse('posts:profile_unfollow',
+                       kwargs={'username': 'auth'})
 
 
 class ViewsTests(TestCase):
@@ -122,3 +144,592 @@ class PaginatorViewsTests(TestCase):
                 response = self.authorized_client.get(url)
                 self.assertEqual(len(response.context['page_obj']),
                                  page_size)
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        # У каждого поста свой автор: N+1 по author проявится сразу
+        authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(PAGINATOR_PAGE_SIZE + 5)
+        ]
+        Post.objects.bulk_create(
+            Post(author=author, text='Тестовый пост', group=cls.group)
+            for author in authors
+        )
+        cls.post = Post.objects.first()
+        cls.POST_DETAIL_URL = reverse('posts:post_detail',
+                                      kwargs={'post_id': cls.post.id})
+        # Профиль автора с несколькими постами: счётчик не в цикле
+        Post.objects.bulk_create(
+            Post(author=cls.post.author, text='Ещё пост')
+            for make_post in range(PAGINATOR_PAGE_SIZE)
+        )
+        call_command('recount_posts', stdout=StringIO())
+        cls.PROFILE_URL = reverse('posts:profile',
+                                  kwargs={'username': cls.post.author})
+
+    def setUp(self):
+        cache.clear()
+        # Сброс буфера просмотров не должен попасть в подсчёт запросов
+        view_counter.take()
+        self.guest_client = Client()
+
+    def test_views_query_budget(self):
+        """Число запросов страницы не зависит от числа постов на ней."""
+        # Кэш пользователей холодный: все авторы страницы одним запросом
+        budgets = [
+            [MAIN_URL, 3],
+            [MAIN_URL + '?page=2', 3],
+            [GROUP_URL, 4],
+            # Автор со счётчиком постов и страница постов
+            [self.PROFILE_URL, 2],
+            # Валидаторы условного GET, сама страница и похожие посты
+            [self.POST_DETAIL_URL, 3],
+        ]
+        for url, queries in budgets:
+            cache.clear()
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    self.guest_client.get(url)
+
+    def test_warm_user_cache_skips_authors_query(self):
+        self.guest_client.get(GROUP_URL)
+        with self.assertNumQueries(3):
+            self.guest_client.get(GROUP_URL)
+        # Профиль из кэша имён: счётчик автора и страница постов
+        with self.assertNumQueries(2):
+            self.guest_client.get(self.PROFILE_URL)
+
+    def test_user_change_refreshes_cached_name(self):
+        self.guest_client.get(self.PROFILE_URL)
+        author = User.objects.get(pk=self.post.author_id)
+        author.first_name = 'Новое'
+        author.username = 'renamed'
+        author.save()
+        self.assertEqual(
+            self.guest_client.get(self.PROFILE_URL).status_code, 404)
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'renamed'}))
+        self.assertContains(response, 'Новое')
+
+
+class CursorPaginatorViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, text='Тестовый пост', group=cls.group)
+            for make_post in range(PAGINATOR_PAGE_SIZE + 5)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_cursor_walks_feed(self):
+        """Курсор проходит ленту вперёд и назад без пропусков и повторов."""
+        for url in [MAIN_URL, GROUP_URL, PROFILE_URL]:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url + '?cursor=').context[
+                    'page_obj']
+                self.assertEqual(len(first), PAGINATOR_PAGE_SIZE)
+                self.assertTrue(first.has_next())
+                self.assertFalse(first.has_previous())
+                second = self.guest_client.get(
+                    url, {'cursor': first.next_cursor}).context['page_obj']
+                self.assertEqual(len(second), 5)
+                self.assertFalse(second.has_next())
+                self.assertTrue(second.has_previous())
+                pks = [post.pk for post in list(first) + list(second)]
+                self.assertEqual(
+                    pks,
+                    list(Post.objects.order_by('-pub_date', '-pk')
+                         .values_list('pk', flat=True)))
+                back = self.guest_client.get(
+                    url, {'cursor': second.previous_cursor}).context[
+                        'page_obj']
+                self.assertEqual([post.pk for post in back],
+                                 [post.pk for post in first])
+
+    def test_cursor_page_costs_one_query(self):
+        first = self.guest_client.get(MAIN_URL + '?cursor=').context[
+            'page_obj']
+        with self.assertNumQueries(1):
+            self.guest_client.get(MAIN_URL, {'cursor': first.next_cursor})
+
+    def test_previous_cursor_past_newest_shows_first_page(self):
+        newest = Post(pk=10 ** 6, pub_date=timezone.now() + timedelta(
+            days=365))
+        response = self.guest_client.get(
+            MAIN_URL, {'cursor': encode_cursor(PREVIOUS, newest)})
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertEqual(len(page), PAGINATOR_PAGE_SIZE)
+        self.assertFalse(page.has_previous())
+
+    def test_empty_cursor_page_has_no_cursors(self):
+        page = CursorPaginator(Post.objects.none(), PAGINATOR_PAGE_SIZE
+                               ).get_page(None)
+        self.assertEqual((page.next_cursor, page.previous_cursor),
+                         (None, None))
+
+    def test_broken_cursor_shows_first_page(self):
+        page = self.guest_client.get(MAIN_URL, {'cursor': 'мусор'}).context[
+            'page_obj']
+        self.assertEqual(len(page), PAGINATOR_PAGE_SIZE)
+        self.assertFalse(page.has_previous())
+
+
+class IndexFeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author, text='Старый пост')
+
+    def setUp(self):
+        cache.clear()
+        caches['snapshots'].clear()
+        feed_stats.reset()
+        self.guest_client = Client()
+
+    def test_repeated_page_served_from_cache(self):
+        self.guest_client.get(MAIN_URL)
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(MAIN_URL)
+        self.assertContains(response, self.post.text)
+        self.assertNotContains(response, '&lt;ul&gt;')
+        feed_stats.publish()
+        stats = feed_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertIsNotNone(stats['version'])
+
+    def test_write_invalidates_cached_page(self):
+        """Новый пост виден сразу после записи."""
+        self.guest_client.get(MAIN_URL)
+        Post.objects.create(author=self.author, text='Свежий пост')
+        self.assertContains(self.guest_client.get(MAIN_URL), 'Свежий пост')
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertContains(self.guest_client.get(MAIN_URL),
+                            'Исправленный пост')
+
+
+class PostBodyCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Первая строка\n<b>Вторая</b>')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lru_in_front_of_shared_cache(self):
+        bodies = BodyCache(capacity=1)
+        html = 'Первая строка<br>&lt;b&gt;Вторая&lt;/b&gt;'
+        self.assertEqual(bodies.get(self.post), html)
+        self.assertEqual(bodies.get(self.post), html)
+        other_process = BodyCache(capacity=1)
+        self.assertEqual(other_process.get(self.post), html)
+        bodies.get(Post(pk=self.post.pk + 1, text='Другой'))
+        stats, other_stats = bodies.stats(), other_process.stats()
+        self.assertEqual((stats['misses'], stats['lru_hits']), (2, 1))
+        self.assertEqual(other_stats['cache_hits'], 1)
+        self.assertEqual(stats['entries'], 1)
+
+    def test_edit_shows_new_body(self):
+        client = Client()
+        client.force_login(self.author)
+        detail_url = reverse('posts:post_detail', args=[self.post.pk])
+        self.assertContains(client.get(MAIN_URL), 'Первая строка<br>')
+        client.post(reverse('posts:post_edit', args=[self.post.pk]),
+                    {'text': 'Новый текст'})
+        self.assertContains(client.get(MAIN_URL), 'Новый текст')
+        self.assertContains(client.get(detail_url), 'Новый текст')
+        self.assertNotContains(client.get(detail_url), 'Первая строка')
+
+
+class GroupIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='auth')
+        cls.big, cls.fresh, cls.empty = (
+            Group.objects.create(title=title, slug=slug)
+            for title, slug in (('Б', 'big'), ('В', 'fresh'), ('А', 'empty')))
+        for group in (cls.big, cls.big, cls.fresh):
+            Post.objects.create(author=author, group=group, text='Тест')
+
+    def setUp(self):
+        cache.clear()
+
+    def slugs(self, response):
+        return [group['slug'] for group in response.context['page_obj']]
+
+    def test_sorting(self):
+        cases = {
+            'activity': ['fresh', 'big', 'empty'],
+            'size': ['big', 'fresh', 'empty'],
+            'title': ['empty', 'big', 'fresh'],
+        }
+        for sort, slugs in cases.items():
+            with self.subTest(sort=sort):
+                response = self.client.get(GROUPS_URL, {'sort': sort})
+                self.assertEqual(self.slugs(response), slugs)
+        self.assertContains(response, 'Постов: 2')
+        self.assertContains(response, 'пока нет')
+        response = self.client.get(GROUPS_URL, {'sort': 'unknown'})
+        self.assertEqual(response.context['sort'], 'activity')
+
+    def test_page_cached_until_post_write(self):
+        self.client.get(GROUPS_URL)
+        with self.assertNumQueries(0):
+            self.client.get(GROUPS_URL)
+        Post.objects.create(author=User.objects.get(), group=self.empty,
+                            text='Первый пост')
+        response = self.client.get(GROUPS_URL)
+        self.assertEqual(self.slugs(response), ['empty', 'fresh', 'big'])
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.once = Post.objects.create(
+            author=cls.author, text='Кот спит на диване')
+        cls.twice = Post.objects.create(
+            author=cls.author, text='Кот и ещё раз кот')
+        cls.other = Post.objects.create(
+            author=cls.author, text='Собака гуляет')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query):
+        return self.guest_client.get(SEARCH_URL, {'q': query}).context[
+            'page_obj']
+
+    def test_search_ranks_matches(self):
+        """Поиск находит посты по словам и ставит релевантные выше."""
+        self.assertEqual([post.pk for post in self.search('КОТ')],
+                         [self.twice.pk, self.once.pk])
+        self.assertEqual([post.pk for post in self.search('кот диване')],
+                         [self.once.pk])
+
+    def test_search_index_follows_edits(self):
+        self.twice.text = 'Теперь про собаку'
+        self.twice.save()
+        self.assertEqual([post.pk for post in self.search('кот')],
+                         [self.once.pk])
+        self.other.delete()
+        self.assertEqual(len(self.search('собака')), 0)
+
+    def test_search_survives_query_syntax(self):
+        for query in ['"', 'кот OR', 'NEAR(', '']:
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.guest_client.get(SEARCH_URL, {'q': query})
+                    .status_code, 200)
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.guest_client.force_login(admin)
+        response = self.guest_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кот'})
+        self.assertEqual(
+            {post.pk for post in response.context['cl'].result_list},
+            {self.once.pk, self.twice.pk})
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group)
+        cls.POST_DETAIL_URL = reverse('posts:post_detail',
+                                      kwargs={'post_id': cls.post.id})
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_unchanged_pages_return_304_without_page_query(self):
+        budgets = [
+            [MAIN_URL, 0],
+            [GROUP_URL, 0],
+            [PROFILE_URL, 0],
+            [self.POST_DETAIL_URL, 1],
+        ]
+        for url, queries in budgets:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(queries):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_validators(self):
+        urls = [MAIN_URL, GROUP_URL, PROFILE_URL, self.POST_DETAIL_URL]
+        etags = {url: self.guest_client.get(url)['ETag'] for url in urls}
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_group_and_author_changes_change_post_etag(self):
+        group = Group.objects.get(pk=self.group.pk)
+        author = User.objects.get(pk=self.author.pk)
+        for changed, field, value in ((group, 'title', 'Новое название'),
+                                      (author, 'first_name', 'Иван')):
+            with self.subTest(field=field):
+                etag = self.guest_client.get(self.POST_DETAIL_URL)['ETag']
+                setattr(changed, field, value)
+                changed.save()
+                response = self.guest_client.get(
+                    self.POST_DETAIL_URL, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, value)
+
+    def test_post_page_has_no_last_modified(self):
+        response = self.guest_client.get(self.POST_DETAIL_URL)
+        self.assertNotIn('Last-Modified', response)
+        # Счётчик автора меняется без правки поста: If-Modified-Since
+        # не должен отвечать 304 на устаревшую страницу
+        Post.objects.create(author=self.author, text='Ещё пост')
+        response = self.guest_client.get(
+            self.POST_DETAIL_URL,
+            HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_gets_own_etag(self):
+        etag = self.guest_client.get(MAIN_URL)['ETag']
+        self.guest_client.force_login(self.author)
+        self.assertEqual(
+            self.guest_client.get(MAIN_URL, HTTP_IF_NONE_MATCH=etag)
+            .status_code, 200)
+
+
+class FollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Пост до подписки')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.stranger_client = Client()
+        self.stranger_client.force_login(self.stranger)
+
+    def feed(self, client):
+        return [entry.post for entry in
+                client.get(FOLLOW_INDEX_URL).context['page_obj']]
+
+    def work(self):
+        call_command('run_worker', '--burst', '--threads=1',
+                     stdout=StringIO())
+
+    def test_follow_backfills_and_fans_out(self):
+        self.reader_client.post(FOLLOW_URL)
+        self.reader_client.post(FOLLOW_URL)
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 1)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 1)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        # Раскладка — фоновая задача: до воркера ленты не меняются
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=new_post).exists())
+        self.work()
+        self.assertEqual(self.feed(self.reader_client),
+                         [new_post, self.old_post])
+        self.assertEqual(self.feed(self.stranger_client), [])
+
+    def test_cannot_follow_self(self):
+        client = Client()
+        client.force_login(self.author)
+        client.post(FOLLOW_URL)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_unfollow_clears_timeline_and_profile_etag(self):
+        self.reader_client.post(FOLLOW_URL)
+        etag = self.reader_client.get(PROFILE_URL)['ETag']
+        self.reader_client.post(UNFOLLOW_URL)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 0)
+        response = self.reader_client.get(
+            PROFILE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['following'])
+
+    def test_popular_author_pulled_on_read(self):
+        self.reader_client.post(FOLLOW_URL)
+        with mock.patch('posts.timeline.TIMELINE_FANOUT_MAX_FOLLOWERS', 0):
+            new_post = Post.objects.create(
+                author=self.author, text='Пост популярного автора')
+            self.work()
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=new_post).exists())
+            self.assertEqual(self.feed(self.reader_client),
+                             [new_post, self.old_post])
+
+    def test_batch_create_fans_out(self):
+        self.reader_client.post(FOLLOW_URL)
+        client = Client()
+        client.force_login(self.author)
+        client.post(reverse('posts:post_batch_create'),
+                    '{"posts": [{"text": "Из пакета"}]}',
+                    content_type='application/json')
+        self.work()
+        self.assertEqual([post.text for post in self.feed(
+            self.reader_client)], ['Из пакета', self.old_post.text])
+
+    def test_follow_page_is_one_timeline_query(self):
+        self.reader_client.post(FOLLOW_URL)
+        self.feed(self.reader_client)
+        # Сессия, пользователь и страница ленты: авторы уже в кэше
+        with self.assertNumQueries(3):
+            self.reader_client.get(FOLLOW_INDEX_URL)
+
+
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {number}')
+            for number in range(3))
+        cls.posts = list(Post.objects.order_by('pk'))
+
+    def setUp(self):
+        view_counter.take()
+        self.guest_client = Client()
+
+    def test_views_buffered_then_flushed_in_one_update(self):
+        counter = ViewCounter(interval=3600, threshold=4)
+        first, second, _ = self.posts
+        PostStats.objects.create(post=first)
+        PostStats.objects.create(post=second)
+        with self.assertNumQueries(0):
+            for post in (first, first, second):
+                counter.hit(post.pk)
+        self.assertEqual(counter.pending_views(first.pk), 2)
+        # Транзакция: известные счётчики и один UPDATE ... CASE на все посты
+        with self.assertNumQueries(4):
+            counter.hit(first.pk)
+        self.assertEqual(
+            dict(PostStats.objects.values_list('post_id', 'views_count')),
+            {first.pk: 3, second.pk: 1})
+        self.assertEqual(counter.pending_views(first.pk), 0)
+
+    def test_workers_do_not_lose_updates(self):
+        workers = [ViewCounter(interval=3600, threshold=1000)
+                   for _ in range(2)]
+        post = self.posts[0]
+        for worker in workers:
+            for _ in range(5):
+                worker.hit(post.pk)
+        for worker in workers:
+            worker.flush()
+        self.assertEqual(PostStats.objects.get(post=post).views_count, 10)
+
+    def test_failed_flush_keeps_views(self):
+        counter = ViewCounter(interval=3600, threshold=1000)
+        counter.hit(self.posts[0].pk)
+        with mock.patch('posts.view_counter.write_views',
+                        side_effect=DatabaseError):
+            self.assertEqual(counter.flush(), 0)
+        self.assertEqual(counter.pending_views(self.posts[0].pk), 1)
+        self.assertEqual(counter.flush(), 1)
+        self.assertEqual(
+            PostStats.objects.get(post=self.posts[0]).views_count, 1)
+
+    def test_detail_counts_views_and_popular_ranks(self):
+        popular, other, _ = self.posts
+        for _ in range(2):
+            response = self.guest_client.get(
+                reverse('posts:post_detail', kwargs={'post_id': popular.pk}))
+        self.assertEqual(response.context['views_count'], 2)
+        self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': other.pk}))
+        view_counter.flush()
+        self.assertEqual(
+            list(self.guest_client.get(POPULAR_URL).context['page_obj']),
+            [popular, other])
+
+    def test_revalidation_counts_view_and_views_change_etag(self):
+        post = self.posts[0]
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(view_counter.pending_views(post.pk), 2)
+        view_counter.flush()
+        # Записанные просмотры меняют ETag: 304 с устаревшим счётчиком нет
+        self.assertEqual(self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class TrendingViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {number}', group=cls.group)
+            for number in range(3))
+        cls.posts = list(Post.objects.order_by('pk'))
+        now = timezone.now()
+        TrendingScore.objects.bulk_create(
+            [TrendingScore(kind=TrendingScore.POST, object_id=post.pk,
+                           score=score, computed_at=now)
+             for post, score in zip(cls.posts, (1, 3, 2))]
+            + [TrendingScore(kind=TrendingScore.GROUP,
+                             object_id=cls.group.pk, score=6,
+                             computed_at=now)])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_serves_precomputed_order(self):
+        # Два списка id по индексу, посты, их авторы и группы
+        with self.assertNumQueries(5):
+            response = self.client.get(TRENDING_URL)
+        first, second, third = self.posts
+        self.assertEqual(response.context['posts'], [second, third, first])
+        self.assertEqual(response.context['groups'], [self.group])
@@ -0,0 +1,133 @@
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .models import FEED_FIELDS, AuthorStats, Follow, Post, TimelineEntry
+from .settings import (TIMELINE_BACKFILL_SIZE, TIMELINE_FANOUT_BATCH_SIZE,
+                       TIMELINE_FANOUT_MAX_FOLLOWERS, TIMELINE_PULL_LIMIT,
+                       TIMELINE_PULL_SECONDS)
+
+PULLED_KEY = 'timeline:pulled:{user_id}'
+FOLLOWS_VERSION_KEY = 'timeline:follows:{user_id}'
+# Карточке в ленте подписок нужны те же поля поста, что и в других лентах
+ENTRY_FIELDS = ('pub_date',) + tuple(f'post__{name}' for name in FEED_FIELDS)
+
+
+def timeline_entries(user):
+    """Лента подписок читателя: строки ленты вместе с постами и группами."""
+    return TimelineEntry.objects.filter(user=user).select_related(
+        'post__group').only(*ENTRY_FIELDS).order_by('-pub_date', '-pk')
+
+
+def insert_entries(entries, db):
+    # Пост мог уже попасть в ленту из подписки или подтягивания
+    TimelineEntry.objects.using(db).bulk_create(
+        entries, batch_size=TIMELINE_FANOUT_BATCH_SIZE, ignore_conflicts=True)
+
+
+def fan_out(author_id, posts):
+    """Раскладывает новые посты автора по лентам подписчиков.
+
+    Подписчики читаются по индексу подписок на автора целиком, до
+    вставки: их не больше TIMELINE_FANOUT_MAX_FOLLOWERS, а открытый
+    курсор держал бы блокировку чтения SQLite, и два воркера очереди,
+    раскладывающие посты одновременно, не смогли бы писать. Строки
+    ленты вставляются пакетами. Посты популярных авторов не
+    раскладываются: их читатели подтягивают сами.
+    """
+    db = DEFAULT_DB_ALIAS
+    followers_count = AuthorStats.objects.using(db).filter(
+        author_id=author_id).values_list('followers_count', flat=True).first()
+    if not posts or not followers_count or (
+            followers_count > TIMELINE_FANOUT_MAX_FOLLOWERS):
+        return
+    followers = list(Follow.objects.using(db).filter(
+        author_id=author_id).values_list('user_id', flat=True))
+    entries = []
+    for user_id in followers:
+        entries.extend(
+            TimelineEntry(user_id=user_id, post_id=post.pk,
+                          pub_date=post.pub_date)
+            for post in posts)
+        if len(entries) >= TIMELINE_FANOUT_BATCH_SIZE:
+            insert_entries(entries, db)
+            entries = []
+    insert_entries(entries, db)
+
+
+def backfill(user_id, author_id):
+    """Кладёт в ленту нового подписчика последние посты автора."""
+    db = DEFAULT_DB_ALIAS
+    posts = Post.objects.using(db).filter(author_id=author_id).order_by(
+        '-pub_date', '-pk').values_list('pk', 'pub_date')
+    insert_entries([
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts[:TIMELINE_BACKFILL_SIZE]
+    ], db)
+
+
+def drop(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося читателя."""
+    db = DEFAULT_DB_ALIAS
+    TimelineEntry.objects.using(db).filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def pull_followed(user):
+    """Подтягивает в ленту читателя посты популярных авторов.
+
+    Раскладка по тысячам лент на каждый пост такого автора дороже,
+    чем вставка при чтении. Подтягиваем не чаще раза в
+    TIMELINE_PULL_SECONDS, с перекрытием на тот же срок: пост,
+    записанный в долгой транзакции, не потеряется. Возвращает True,
+    если в ленту что-то добавилось. Пишем прямо в default, как и
+    раскладка в воркере: router.db_for_write закрепил бы за основной
+    базой каждого читателя ленты подписок.
+    """
+    key = PULLED_KEY.format(user_id=user.pk)
+    now = timezone.now()
+    pulled_at = cache.get(key)
+    if pulled_at is not None and (
+            now - pulled_at).total_seconds() < TIMELINE_PULL_SECONDS:
+        return False
+    db = DEFAULT_DB_ALIAS
+    authors = list(Follow.objects.using(db).filter(
+        user=user,
+        author__stats__followers_count__gt=TIMELINE_FANOUT_MAX_FOLLOWERS,
+    ).values_list('author_id', flat=True))
+    entries = []
+    if authors:
+        posts = Post.objects.using(db).filter(author_id__in=authors)
+        if pulled_at is not None:
+            posts = posts.filter(pub_date__gte=pulled_at - timedelta(
+                seconds=TIMELINE_PULL_SECONDS))
+        entries = [
+            TimelineEntry(user_id=user.pk, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts.order_by('-pub_date').values_list(
+                'pk', 'pub_date')[:TIMELINE_PULL_LIMIT]
+        ]
+        insert_entries(entries, db)
+    cache.set(key, now, None)
+    return bool(entries)
+
+
+def get_follows_version(user_id):
+    key = FOLLOWS_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # Версия от времени: после вытеснения ключа не совпадёт со старыми
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_follows_version(user_id):
+    """Меняет ETag профилей для читателя, у которого изменились подписки."""
+    key = FOLLOWS_VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), None)
@@ -0,0 +1,112 @@
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.utils import timezone
+
+from .models import Post, PostStats, TrendingScore
+from .settings import (POST_VIEWS_FLUSH_CHUNK, TRENDING_HALF_LIFE_HOURS,
+                       TRENDING_MIN_SCORE, TRENDING_STATE_SIZE,
+                       TRENDING_WEIGHTS, TRENDING_WINDOW_HOURS)
+from .view_counter import by_post
+
+# Вид рейтинга зашит в младший бит ключа: id * 2 + номер вида
+KINDS = (TrendingScore.POST, TrendingScore.GROUP)
+
+
+def decayed_totals(keys, weights, ages, half_life):
+    """Суммы весов по ключам с затуханием по возрасту: {ключ: рейтинг}."""
+    totals = defaultdict(float)
+    for key, weight, age in zip(keys, weights, ages):
+        totals[key] += weight * 2 ** (-age / half_life)
+    return totals
+
+
+class Events:
+    """События для расчёта: ключ, вес и возраст в секундах."""
+
+    def __init__(self, now):
+        self.now = now
+        self.keys = []
+        self.weights = []
+        self.ages = []
+
+    def add(self, kind, object_id, weight, at):
+        self.keys.append(object_id * 2 + KINDS.index(kind))
+        self.weights.append(weight)
+        self.ages.append((self.now - at).total_seconds())
+
+    def add_post(self, post_id, group_id, weight, at):
+        # Событие поста поднимает и его группу
+        self.add(TrendingScore.POST, post_id, weight, at)
+        if group_id is not None:
+            self.add(TrendingScore.GROUP, group_id, weight, at)
+
+
+def take_recent_views(db):
+    """Просмотры с прошлого расчёта: [(post_id, group_id, просмотры)].
+
+    Забранное вычитается, а не обнуляется: просмотры, сброшенные
+    воркерами за время расчёта, дождутся следующего запуска.
+    """
+    views = list(PostStats.objects.using(db).filter(
+        recent_views__gt=0).values_list(
+            'post_id', 'post__group', 'recent_views'))
+    for start in range(0, len(views), POST_VIEWS_FLUSH_CHUNK):
+        taken = {pk: count for pk, _, count in
+                 views[start:start + POST_VIEWS_FLUSH_CHUNK]}
+        PostStats.objects.using(db).filter(post_id__in=taken).update(
+            recent_views=models.F('recent_views') - by_post(taken))
+    return views
+
+
+def compute_trending(now=None):
+    """Пересчитывает TrendingScore от прошлого расчёта.
+
+    Рейтинг затухает экспоненциально, поэтому весь расчёт не нужен:
+    прошлые рейтинги умножаются на 2^(-прошло / полураспад), и к ним
+    прибавляются только события с прошлого запуска — новые посты,
+    правки и просмотры. Возвращает число событий и рейтингов.
+    """
+    now = now or timezone.now()
+    db = DEFAULT_DB_ALIAS
+    with transaction.atomic(using=db):
+        state = list(TrendingScore.objects.using(db).values_list(
+            'kind', 'object_id', 'score', 'computed_at'))
+        since = max((row[3] for row in state), default=None) or (
+            now - timedelta(hours=TRENDING_WINDOW_HOURS))
+        events = Events(now)
+        for kind, object_id, score, _ in state:
+            events.add(kind, object_id, score, since)
+        # Порядок событий не важен: без сортировки из Post.Meta
+        posts = Post.objects.using(db).order_by()
+        for pk, group_id, pub_date in posts.filter(
+                pub_date__gt=since, pub_date__lte=now).values_list(
+                    'pk', 'group', 'pub_date'):
+            events.add_post(pk, group_id, TRENDING_WEIGHTS['post'], pub_date)
+        for pk, group_id, updated_at in posts.filter(
+                updated_at__gt=since, updated_at__lte=now,
+                pub_date__lte=since).values_list('pk', 'group', 'updated_at'):
+            events.add_post(pk, group_id, TRENDING_WEIGHTS['edit'], updated_at)
+        # Время просмотров не хранится: считаем их в середине промежутка
+        viewed_at = since + (now - since) / 2
+        for pk, group_id, count in take_recent_views(db):
+            events.add_post(
+                pk, group_id, TRENDING_WEIGHTS['view'] * count, viewed_at)
+        totals = decayed_totals(
+            events.keys, events.weights, events.ages,
+            TRENDING_HALF_LIFE_HOURS * 60 * 60)
+        scores = []
+        for index, kind in enumerate(KINDS):
+            scores.extend(
+                TrendingScore(kind=kind, object_id=key // 2, score=score,
+                              computed_at=now)
+                for key, score in heapq.nlargest(
+                    TRENDING_STATE_SIZE,
+                    ((key, score) for key, score in totals.items()
+                     if key % 2 == index and score >= TRENDING_MIN_SCORE),
+                    key=lambda item: item[1]))
+        TrendingScore.objects.using(db).all().delete()
+        TrendingScore.objects.using(db).bulk_create(scores)
+    return {'events': len(events.keys), 'scores': len(scores)}
@@ -0,0 +1,81 @@
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .settings import USER_CACHE_TIMEOUT
+
+User = get_user_model()
+
+USER_KEY = 'user:id:{pk}'
+USERNAME_KEY = 'user:name:{digest}'
+# Ровно те поля, что ленты и профиль выводят об авторе
+USER_FIELDS = ('pk', 'username', 'first_name', 'last_name')
+
+
+def username_key(username):
+    # Имя может быть длинным и не-ASCII, а ключи memcached — нет
+    digest = hashlib.md5(username.encode()).hexdigest()
+    return USERNAME_KEY.format(digest=digest)
+
+
+def build_user(row):
+    return User(**dict(zip(USER_FIELDS, row)))
+
+
+def remember_users(rows):
+    entries = {}
+    for row in rows:
+        entries[USER_KEY.format(pk=row[0])] = row
+        entries[username_key(row[1])] = row
+    cache.set_many(entries, USER_CACHE_TIMEOUT)
+
+
+def users_by_id(ids):
+    """{id: User} по кэшу; недостающих добирает одним запросом."""
+    keys = {USER_KEY.format(pk=pk): pk for pk in set(ids)}
+    rows = cache.get_many(keys)
+    missing = [pk for key, pk in keys.items() if key not in rows]
+    if missing:
+        fetched = list(User.objects.filter(pk__in=missing).values_list(
+            *USER_FIELDS))
+        remember_users(fetched)
+        rows.update((USER_KEY.format(pk=row[0]), row) for row in fetched)
+    return {pk: build_user(rows[key]) for key, pk in keys.items()
+            if key in rows}
+
+
+def user_by_username(username):
+    """Пользователь по имени или None.
+
+    Из кэша приходит только USER_FIELDS. На промахе счётчик постов
+    загружается тем же запросом, так что get_posts_count не пойдёт
+    в базу второй раз.
+    """
+    row = cache.get(username_key(username))
+    if row is not None:
+        return build_user(row)
+    user = User.objects.select_related('stats').filter(
+        username=username).first()
+    if user is not None:
+        remember_users([(user.pk, user.username, user.first_name,
+                         user.last_name)])
+    return user
+
+
+def attach_authors(posts):
+    """Кладёт авторов из кэша в посты, загруженные без JOIN с users."""
+    field = posts[0]._meta.get_field('author') if posts else None
+    authors = users_by_id(post.author_id for post in posts)
+    for post in posts:
+        if post.author_id in authors:
+            field.set_cached_value(post, authors[post.author_id])
+
+
+def forget_user(user):
+    """Убирает пользователя из кэша, в том числе под прежним именем."""
+    keys = [USER_KEY.format(pk=user.pk), username_key(user.username)]
+    cached = cache.get(keys[0])
+    if cached is not None:
+        keys.append(username_key(cached[1]))
+    cache.delete_many(keys)
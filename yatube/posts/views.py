@@ -1,26 +1,126 @@
+import functools
+import json
+from collections import defaultdict
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import (DEFAULT_DB_ALIAS, DatabaseError, connections, router,
+                       transaction)
+from django.db.models import F, Max
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.views.decorators.http import condition, require_POST
+
+from core.jobs import enqueue
+
+from .feed_cache import (bump_feed_version, get_feed_version,
+                         render_group_directory, render_index_feed)
+from .forms import BatchPostForm, PostForm
+from .models import (Follow, Post, Group, RelatedPost, TrendingScore, User,
+                     get_posts_count, get_views_count)
+from .paginators import CursorPaginator
+from .ratelimit import TokenBucket
+from .settings import (PAGINATOR_PAGE_SIZE, POST_BATCH_BURST,
+                       POST_BATCH_MAX_SIZE, POST_BATCH_RATE, RELATED_POSTS,
+                       TRENDING_TOP)
+from .signals import change_posts_count
+from .timeline import get_follows_version, pull_followed, timeline_entries
+from .user_cache import attach_authors, user_by_username
+from .view_counter import view_counter
+
+post_batch_bucket = TokenBucket(
+    'ratelimit:post_batch', POST_BATCH_BURST, POST_BATCH_RATE)
 
-from .forms import PostForm
-from .models import Post, Group, User
-from .settings import PAGINATOR_PAGE_SIZE
 
+# Сортировки каталога групп: название в URL → порядок
+GROUP_SORTS = {
+    'activity': (F('last_post_at').desc(nulls_last=True), 'title', 'id'),
+    'size': ('-posts_count', 'title', 'id'),
+    'title': ('title', 'id'),
+}
 
-def pagination(request, post_list):
+
+def pagination(request, post_list, cursor=True, count=None):
+    if cursor and 'cursor' in request.GET:
+        return CursorPaginator(post_list, PAGINATOR_PAGE_SIZE).get_page(
+            request.GET['cursor'])
     paginator = Paginator(post_list, PAGINATOR_PAGE_SIZE)
+    if count is not None:
+        # Число объектов уже известно: без отдельного COUNT(*)
+        paginator.count = count
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+def feed_etag(request, *args, **kwargs):
+    """ETag лент: версия ленты из кэша, без запросов к базе.
+
+    Версия меняется при любой записи поста, группы или пользователя.
+    В шапке виден вошедший пользователь, поэтому он тоже в ETag.
+    """
+    return f'{get_feed_version()}-{request.user.pk or 0}'
+
+
+def profile_etag(request, username):
+    """ETag профиля: к версии ленты добавляется версия подписок читателя.
+
+    Кнопка «Подписаться» зависит от подписок читателя, а они не меняют
+    версию общей ленты.
+    """
+    etag = feed_etag(request)
+    if request.user.is_authenticated:
+        etag += f'-{get_follows_version(request.user.pk)}'
+    return etag
+
+
+def post_etag(request, post_id):
+    """ETag поста: время изменения, счётчик автора, просмотры и похожие.
+
+    Название группы и имя автора на странице меняются без правки поста:
+    их покрывает версия ленты, которую сдвигают такие записи. Просмотры —
+    записанные в базу и с точностью до двух значащих цифр: иначе ETag
+    менялся бы на каждый сброс буфера. Похожие посты build_related_posts
+    переписывает заново, и их строки получают новые id: наибольший из
+    них — версия блока. Last-Modified не отдаём:
+    странице нужно больше, чем updated_at, и по одному If-Modified-Since
+    клиент получал бы 304 на устаревшую копию.
+    """
+    validators = Post.objects.filter(pk=post_id).order_by().annotate(
+        related_version=Max('related_links__id')).values_list(
+            'updated_at', 'author__stats__posts_count',
+            'stats__views_count', 'related_version').first()
+    if validators is None:
+        return None
+    updated_at, posts_count, views_count, related_version = validators
+    return (f'{updated_at.timestamp()}-{posts_count}-'
+            f'{views_count or 0:.2g}-{related_version or 0}-'
+            f'{feed_etag(request)}')
+
+
+def count_view(view):
+    """Считает просмотр до condition(): ответ 304 — тоже прочтение."""
+    @functools.wraps(view)
+    def wrapper(request, post_id):
+        # Просмотр копится в памяти, без запроса к базе
+        view_counter.hit(post_id)
+        return view(request, post_id)
+    return wrapper
+
+
+@condition(etag_func=feed_etag)
 def index(request):
+    page_obj = pagination(request, Post.objects.for_feed())
     return render(request, 'posts/index.html', {
-        'page_obj': pagination(request, Post.objects.all()), })
+        'page_obj': page_obj,
+        'feed_html': render_index_feed(request, page_obj),
+    })
 
 
+@condition(etag_func=feed_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    post_list = group.posts.for_feed()
     context = {
         'group': group,
         'page_obj': pagination(request, post_list),
@@ -28,24 +128,133 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    # Автор из кэша имён: запрос к базе только на промахе, и тогда
+    # сразу со счётчиком постов
+    author = user_by_username(username)
+    if author is None:
+        raise Http404('Пользователь не найден.')
+    posts_count = get_posts_count(author)
+    post_list = author.posts.for_feed()
+    following = (
+        request.user.is_authenticated and request.user != author
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    )
     context = {
         'author': author,
-        'page_obj': pagination(request, post_list),
+        'posts_count': posts_count,
+        'following': following,
+        'page_obj': pagination(request, post_list, count=posts_count),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@login_required
+def follow_index(request):
+    """Посты авторов, на которых подписан пользователь.
+
+    Лента заранее разложена по строкам TimelineEntry, поэтому страница —
+    один проход по индексу ленты читателя, всегда по курсору: без
+    COUNT и OFFSET.
+    """
+    entries = timeline_entries(request.user)
+    if pull_followed(request.user):
+        # Только что вставленное реплика могла ещё не получить
+        entries = entries.using(DEFAULT_DB_ALIAS)
+    page_obj = CursorPaginator(entries, PAGINATOR_PAGE_SIZE).get_page(
+        request.GET.get('cursor'))
+    attach_authors([entry.post for entry in page_obj])
+    return render(request, 'posts/follow.html', {'page_obj': page_obj})
+
+
+@login_required
+@require_POST
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    # delete() по запросу шлёт post_delete: счётчик и лента обновятся
+    Follow.objects.filter(
+        user=request.user, author__username=username).delete()
+    return redirect('posts:profile', username=username)
+
+
+@condition(etag_func=feed_etag)
+def group_index(request):
+    sort = request.GET.get('sort')
+    if sort not in GROUP_SORTS:
+        sort = 'activity'
+    # На промахе читаем основную базу: страница живёт до следующей записи
+    groups = Group.objects.using(DEFAULT_DB_ALIAS).directory().order_by(
+        *GROUP_SORTS[sort])
+    context = {
+        'sort': sort,
+        'directory_html': render_group_directory(
+            request, sort,
+            lambda: pagination(request, groups, cursor=False)),
+    }
+    return render(request, 'posts/group_index.html', context)
+
+
+def trending(request):
+    """Популярное из рейтингов compute_trending: только чтение по индексу."""
+    post_ids = list(TrendingScore.objects.top(
+        TrendingScore.POST, TRENDING_TOP))
+    group_ids = list(TrendingScore.objects.top(
+        TrendingScore.GROUP, TRENDING_TOP))
+    posts = Post.objects.for_feed().in_bulk(post_ids) if post_ids else {}
+    groups = Group.objects.in_bulk(group_ids) if group_ids else {}
+    context = {
+        'posts': [posts[pk] for pk in post_ids if pk in posts],
+        'groups': [groups[pk] for pk in group_ids if pk in groups],
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+        'page_obj': pagination(request, Post.objects.for_feed().search(query)),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@count_view
+@condition(etag_func=post_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group', 'stats'),
+        pk=post_id)
+    # На странице — записанные просмотры и накопленные в буфере
     context = {
         'post': post,
+        'posts_count': get_posts_count(post.author),
+        'views_count': get_views_count(post) + view_counter.pending_views(
+            post.pk),
+        # Похожие посты заранее посчитал build_related_posts
+        'related': RelatedPost.objects.filter(post=post).order_by(
+            '-score').values_list('related', 'related__text')[:RELATED_POSTS],
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def popular(request):
+    context = {
+        'page_obj': pagination(
+            request, Post.objects.for_feed().most_viewed(), cursor=False),
+    }
+    return render(request, 'posts/popular.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None)
@@ -57,6 +266,119 @@ def post_create(request):
     return redirect('posts:profile', username=request.user)
 
 
+def bulk_create_posts(author, posts):
+    """Вставляет посты одной транзакцией и проставляет им id.
+
+    bulk_create не шлёт сигналы, поэтому счётчик автора, версию ленты
+    и задачу раскладки по лентам подписчиков делаем сами. SQLite не
+    возвращает id из пакетной вставки: их читает read_back_ids.
+    """
+    db = router.db_for_write(Post)
+    with transaction.atomic(using=db):
+        Post.objects.using(db).bulk_create(posts)
+        if not connections[db].features.can_return_ids_from_bulk_insert:
+            read_back_ids(author, posts, db)
+        change_posts_count(author.pk, len(posts))
+        enqueue('posts.fan_out', author.pk, [post.pk for post in posts])
+    bump_feed_version()
+
+
+def read_back_ids(author, posts, db):
+    """Проставляет id вставленным постам одним запросом.
+
+    Строки ищутся по автору и временам публикации от auto_now_add и
+    сопоставляются с постами по времени и тексту. Старый пост автора с
+    тем же временем и текстом не подменит новый: новые строки получили
+    наибольшие id. Пост без строки — ошибка, и пакет откатывается.
+    """
+    rows = defaultdict(list)
+    for pk, pub_date, text in Post.objects.using(db).filter(
+            author=author, pub_date__in={post.pub_date for post in posts},
+    ).order_by('pk').values_list('pk', 'pub_date', 'text'):
+        rows[pub_date, text].append(pk)
+    for post in reversed(posts):
+        candidates = rows[post.pub_date, post.text]
+        if not candidates:
+            raise DatabaseError('Не найдены id вставленных постов.')
+        post.pk = candidates.pop()
+
+
+def batch_items(body):
+    try:
+        items = json.loads(body)['posts']
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Ожидается JSON вида {"posts": [...]}.')
+    if not isinstance(items, list) or not items:
+        raise ValueError('Список posts пуст или не является списком.')
+    if len(items) > POST_BATCH_MAX_SIZE:
+        raise ValueError(f'Не больше {POST_BATCH_MAX_SIZE} постов за запрос.')
+    return items
+
+
+def batch_groups(items):
+    """Группы всех постов пакета одним запросом: {pk: группа}."""
+    ids = set()
+    for item in items:
+        try:
+            ids.add(int(item.get('group')))
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return Group.objects.in_bulk(ids) if ids else {}
+
+
+def batch_posts(author, items):
+    """Проверяет посты пакета формой: (результаты, верные посты)."""
+    results = []
+    posts = []
+    groups = batch_groups(items)
+    for index, item in enumerate(items):
+        form = BatchPostForm(item if isinstance(item, dict) else {},
+                             groups=groups)
+        if form.is_valid():
+            post = form.save(commit=False)
+            post.author = author
+            posts.append(post)
+            results.append({'index': index, 'post': post})
+        else:
+            results.append(
+                {'index': index, 'errors': form.errors.get_json_data()})
+    return results, posts
+
+
+@require_POST
+def post_batch_create(request):
+    """Пакетное создание постов из JSON {"posts": [{text, group}, ...]}.
+
+    Каждый пост проверяется правилами PostForm, верные вставляются
+    одной транзакцией. В ответе результат по каждому элементу. Каждый
+    присланный пост тратит токен из ведра пользователя.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Требуется авторизация.'}, status=401)
+    try:
+        items = batch_items(request.body)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    allowed, retry_after = post_batch_bucket.consume(
+        request.user.pk, len(items))
+    if not allowed:
+        response = JsonResponse(
+            {'error': 'Слишком много постов, повторите позже.',
+             'retry_after': retry_after}, status=429)
+        response['Retry-After'] = retry_after
+        return response
+    results, posts = batch_posts(request.user, items)
+    if posts:
+        try:
+            bulk_create_posts(request.user, posts)
+        except DatabaseError as error:
+            return JsonResponse({'error': str(error)}, status=503)
+    for result in results:
+        if 'post' in result:
+            result['id'] = result.pop('post').pk
+    return JsonResponse({'created': len(posts), 'results': results})
+
+
 @login_required
 def post_edit(request, post_id):
     is_edit = True
@@ -0,0 +1,20 @@
+"""
+ASGI config for yatube project.
+
+Django 2.2 не умеет ASGI сам, поэтому WSGI-приложение оборачивается
+в core.asgi.WsgiToAsgi: ввод-вывод идёт в цикле событий, а Django —
+в пуле из settings.ASGI_THREADS потоков. Запуск любым ASGI-сервером:
+
+    uvicorn yatube.asgi:application
+"""
+
+import os
+
+from django.conf import settings
+
+from core.asgi import WsgiToAsgi
+from yatube.wsgi import application as wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WsgiToAsgi(wsgi_application, settings.ASGI_THREADS)
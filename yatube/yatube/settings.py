@@ -41,9 +41,12 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'benchmark.apps.BenchmarkConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.TimingMiddleware',
+    'core.middleware.PinPrimaryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,12 +58,23 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yatube.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# В продакшене шаблоны компилируются один раз на процесс; при DEBUG
+# перечитываются с диска, чтобы правки были видны без перезапуска
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -74,6 +88,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Потоки для Django за ASGI-адаптером (yatube/asgi.py): столько запросов
+# одновременно работают с базой и шаблонами, остальные ждут в цикле событий
+ASGI_THREADS = 16
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -85,6 +103,58 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения. Локально их можно проверить на копии базы:
+# cp db.sqlite3 replica.sqlite3 && YATUBE_REPLICA_DB=replica.sqlite3 ...
+DATABASE_REPLICAS = []
+
+if os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, os.environ['YATUBE_REPLICA_DB']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append('replica')
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# Сколько секунд после записи пользователь читает из основной базы
+REPLICA_PIN_SECONDS = 5
+
+# Основной кэш — в памяти процесса. Снимки статистики процессов читают
+# команды timing_stats, post_body_cache_stats и feed_cache_stats из
+# другого процесса, поэтому снимки лежат в общем для процессов кэше
+# (core.snapshots): файлы в каталоге проекта
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'snapshots': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'snapshots_cache'),
+    },
+}
+
+# Сколько последних замеров TimingMiddleware хранит на каждый URL
+# и как часто публикует их в кэш для команды timing_stats
+REQUEST_TIMING_WINDOW = 1000
+REQUEST_TIMING_PUBLISH_SECONDS = 30
+
+# Фоновая очередь core.jobs: потоков воркера по умолчанию, пауза между
+# опросами пустой очереди, попыток до отказа и паузы между ними
+# (экспонента от JOB_BACKOFF_SECONDS до JOB_BACKOFF_MAX_SECONDS)
+JOB_WORKER_THREADS = 4
+JOB_POLL_SECONDS = 1
+JOB_MAX_ATTEMPTS = 5
+JOB_BACKOFF_SECONDS = 5
+JOB_BACKOFF_MAX_SECONDS = 15 * 60
+# Воркер отмечает свои задачи раз в JOB_HEARTBEAT_SECONDS; задача без
+# отметки дольше JOB_TIMEOUT_SECONDS считается брошенной умершим воркером
+JOB_HEARTBEAT_SECONDS = 30
+JOB_TIMEOUT_SECONDS = 5 * 60
+# Сколько хранить выполненные задачи для job_stats
+JOB_KEEP_SECONDS = 24 * 60 * 60
+JOB_ERROR_LENGTH = 4000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -126,6 +196,14 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+
+# Без DEBUG статика собирается с хэшами в именах и сжатыми вариантами
+# и отдаётся core.static.StaticFilesApp из yatube/wsgi.py без nginx
+SERVE_STATIC = not DEBUG
+if SERVE_STATIC:
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
@@ -7,10 +7,27 @@ For more information on this file, see
 https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 """
 
+import atexit
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from core.static import StaticFilesApp
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+
+@atexit.register
+def flush_views():
+    # Перезапуск воркера сервера не должен терять просмотры из буфера;
+    # модели можно импортировать только после настройки Django
+    from posts.view_counter import view_counter
+    view_counter.flush()
+
+
+if settings.SERVE_STATIC:
+    application = StaticFilesApp(
+        application, settings.STATIC_ROOT, settings.STATIC_URL)